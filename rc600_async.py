@@ -0,0 +1,149 @@
+"""
+RC-600 asyncio data layer
+Event-loop friendly wrappers around the blocking Memory / get_latest /
+save calls, for servers, MIDI listeners and file watchers. File I/O runs
+in threads and full parses optionally in processes, each behind its own
+concurrency limit. scan_card() keeps only a bounded window of reads ahead
+of its consumer, and cancelling any call stops the work not yet started.
+"""
+
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import rc600_patch_manager as core
+from rc600_card import read_record
+from rc600_scan import scan_slot
+
+
+class AsyncCard:
+    """
+    Async access to one DATA folder. `io_limit` bounds concurrent file
+    operations; `processes` (optional) parses full records on a process
+    pool, limited to that many at once.
+    """
+
+    def __init__(self, path=None, io_limit=8, processes=None):
+        self.path = path or core.Memory.cwd
+        self.io_limit = asyncio.Semaphore(io_limit)
+        self.window = io_limit
+        self.processes = processes
+        self.parse_limit = asyncio.Semaphore(processes or io_limit)
+        self.executor = None
+        self.slot_locks = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def _io(self, func, *args):
+        async with self.io_limit:
+            return await asyncio.to_thread(func, *args)
+
+    async def _parse(self, func, *args):
+        if not self.processes:
+            return await self._io(func, *args)
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.processes)
+        async with self.parse_limit:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def _slot_lock(self, slot):
+        return self.slot_locks.setdefault(slot, asyncio.Lock())
+
+    async def get_latest(self, slot):
+        """(bank, count) of a slot's active bank"""
+        return await self._io(core.get_latest, self.path, slot)
+
+    async def load_memory(self, slot):
+        """Full Memory for a slot"""
+        return await self._io(core.Memory, slot, self.path)
+
+    async def read_record(self, slot):
+        """Compact record for a slot (see rc600_card.read_record)"""
+        return await self._parse(read_record, self.path, slot)
+
+    async def scan_card(self, slots=range(100), fields=('name',), full=False):
+        """
+        Yield one row per slot, in slot order: scanner rows with the requested
+        fields, or full records with full=True. Unreadable slots yield
+        {'slot', 'error'}. At most `io_limit` slots are read ahead of the
+        consumer; closing or cancelling the iteration cancels them.
+        """
+        async def read(slot):
+            try:
+                if full:
+                    return await self.read_record(slot)
+                return dict(await self._io(scan_slot, self.path, slot, fields), slot=slot)
+            except Exception as e:
+                return {'slot': slot, 'error': str(e)}
+
+        slots = iter(slots)
+        pending = deque()
+        try:
+            for slot in slots:
+                pending.append(asyncio.ensure_future(read(slot)))
+                if len(pending) >= self.window:
+                    break
+            while pending:
+                row = await pending.popleft()
+                next_slot = next(slots, None)
+                if next_slot is not None:
+                    pending.append(asyncio.ensure_future(read(next_slot)))
+                yield row
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def save(self, m, slot=None, to_dir=None):
+        """
+        Save a Memory to the DATA folder it was read from, or to `to_dir`;
+        saves of the same slot never overlap
+        """
+        async with self._slot_lock(slot if slot is not None else m.slot):
+            await self._io(m.save, to_dir, slot)
+
+    async def save_many(self, memories):
+        """
+        Save Memory objects concurrently (bounded by io_limit), each to the
+        DATA folder it was read from. Returns [(slot, exception or None)] in
+        input order; one failed save doesn't stop the others. Cancelling
+        stops the saves that haven't started.
+        """
+        async def run(m):
+            try:
+                await self.save(m)
+                return m.slot, None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                return m.slot, e
+
+        tasks = [asyncio.ensure_future(run(m)) for m in memories]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def load_memory(slot, path=None):
+    return await AsyncCard(path).load_memory(slot)
+
+
+async def scan_card(path=None, slots=range(100), fields=('name',), full=False, io_limit=8):
+    async with AsyncCard(path, io_limit) as card:
+        async for row in card.scan_card(slots, fields, full):
+            yield row
+
+
+async def save_many(memories, path=None, io_limit=4):
+    return await AsyncCard(path, io_limit).save_many(memories)
@@ -0,0 +1,465 @@
+"""
+RC-600 recorded loops
+Indexes the track WAV files in the WAVE folder next to DATA
+(WAVE/nnn_t/nnn_t.WAV for memory nnn, track t) by reading only their
+RIFF/fmt/data headers on a thread pool. Re-scans only re-read files
+whose mtime or size changed, and the index is persisted between runs.
+Slots can be cloned together with their loops, copying the WAVs in the
+kernel (copy_file_range / sendfile) with one thread per track.
+"""
+
+import argparse
+import errno
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import rc600_stats as stats
+from rc600_index import CACHE_DIR
+from rc600_lock import CardLock
+from rc600_patch_manager import DATA_HELP, Memory, check_latest, default_data_path, parse_slots
+from rc600_plan import Plan
+from rc600_setlist import relocate
+
+TRACKS = range(1, 7)
+
+RIFF_HEADER = struct.Struct('<4sI4s')
+CHUNK_HEADER = struct.Struct('<4sI')
+FMT_CHUNK = struct.Struct('<HHIIHH')
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+EXTENSIBLE_FORMAT_OFFSET = 24  # SubFormat GUID, after cbSize, valid bits and channel mask
+
+COPY_CHUNK = 8 * 2**20
+# Errors meaning "this copy method isn't available here", e.g. across filesystems
+COPY_FALLBACK_ERRORS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+
+def wave_dir(path):
+    """The WAVE folder that sits next to a DATA folder"""
+    return os.path.join(os.path.dirname(os.path.abspath(path)), 'WAVE')
+
+
+def track_folder(slot, track):
+    return f'{slot:03}_{track}'
+
+
+def track_file(wave_path, slot, track):
+    folder = track_folder(slot, track)
+    return os.path.join(wave_path, folder, f'{folder}.WAV')
+
+
+def read_header(file):
+    """
+    Read the format and data size of a WAV file from its chunk headers,
+    seeking over other chunks without reading them. Raises ValueError for
+    files that aren't RIFF/WAVE or have no fmt or data chunk.
+    """
+    with stats.timer('audio.header'):
+        with open(file, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            riff, _, wave = RIFF_HEADER.unpack(f.read(RIFF_HEADER.size).ljust(RIFF_HEADER.size, b'\0'))
+            if riff != b'RIFF' or wave != b'WAVE':
+                raise ValueError("not a RIFF/WAVE file")
+
+            fmt = None
+            while True:
+                header = f.read(CHUNK_HEADER.size)
+                if len(header) < CHUNK_HEADER.size:
+                    raise ValueError("no data chunk")
+                chunk, length = CHUNK_HEADER.unpack(header)
+                if chunk == b'fmt ':
+                    if length < FMT_CHUNK.size:
+                        raise ValueError("fmt chunk too short")
+                    fmt = f.read(length + (length & 1))
+                    if len(fmt) < length:
+                        raise ValueError("truncated fmt chunk")
+                elif chunk == b'data':
+                    break
+                else:
+                    f.seek(length + (length & 1), os.SEEK_CUR)
+            offset = f.tell()
+
+    if fmt is None:
+        raise ValueError("no fmt chunk before the data chunk")
+    audio_format, channels, sample_rate, _, block_align, bits = FMT_CHUNK.unpack_from(fmt)
+    if audio_format == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= EXTENSIBLE_FORMAT_OFFSET + 2:
+        # The actual format code is the first two bytes of the SubFormat GUID
+        audio_format, = struct.unpack_from('<H', fmt, EXTENSIBLE_FORMAT_OFFSET)
+    if not sample_rate or not block_align:
+        raise ValueError("invalid fmt chunk")
+
+    # Recordings cut short (e.g. the card was pulled) declare more data than the file holds
+    data_size = min(length, size - offset)
+    frames = data_size // block_align
+    return {
+        'format': audio_format,
+        'channels': channels,
+        'sample_rate': sample_rate,
+        'bits': bits,
+        'block_align': block_align,
+        'data_offset': offset,
+        'data_size': data_size,
+        'frames': frames,
+        'duration': frames / sample_rate,
+    }
+
+
+def _copy_range(infd, outfd, offset, count):
+    return os.copy_file_range(infd, outfd, count, offset, offset)
+
+
+def _sendfile(infd, outfd, offset, count):
+    return os.sendfile(outfd, infd, offset, count)
+
+
+def _pread_write(infd, outfd, offset, count):
+    data = os.pread(infd, count, offset)
+    view = memoryview(data)
+    written = 0
+    while written < len(data):
+        written += os.pwrite(outfd, view[written:], offset + written)
+    return len(data)
+
+
+COPY_METHODS = [method for method, available in (
+    (_copy_range, hasattr(os, 'copy_file_range')),
+    (_sendfile, hasattr(os, 'sendfile')),
+    (_pread_write, True),
+) if available]
+
+
+def copy_file(src, dst, progress=None):
+    """
+    Copy a file without passing its data through Python where the OS
+    allows: copy_file_range (which can share blocks on CoW filesystems),
+    then sendfile, then large pread/pwrite chunks. `progress(n)` is called
+    after every chunk. The copy is fsync'ed; returns the bytes copied.
+    """
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        size = os.fstat(infd).st_size
+        copied = 0
+        for method in COPY_METHODS:
+            try:
+                while copied < size:
+                    n = method(infd, outfd, copied, min(COPY_CHUNK, size - copied))
+                    if not n:
+                        break
+                    copied += n
+                    if progress:
+                        progress(n)
+            except OSError as e:
+                if copied or e.errno not in COPY_FALLBACK_ERRORS:
+                    raise
+            if copied:
+                break
+        with stats.timer('file.fsync'):
+            os.fsync(outfd)
+    stats.count('audio.copied', copied)
+    return copied
+
+
+def clone_slot(path, source, dest, name=None, wave_path=None, progress=None, dry_run=False):
+    """
+    Copy slot `source` to slot `dest` together with its recorded loops.
+    The track WAVs are copied concurrently to temporary files and only
+    moved into place once all of them made it; dest's recordings on tracks
+    the source doesn't have are removed. The patch is written last, to
+    dest's next bank, so dest switches to it in one step. `progress(done,
+    total)` gets the bytes copied so far. Returns a dict with 'entry' (the
+    plan entry), 'tracks' ({track: bytes}), 'removed' (tracks cleared),
+    'bytes' and 'seconds'.
+    """
+    if source == dest:
+        raise ValueError("source and destination are the same slot")
+    wave_path = wave_path or wave_dir(path)
+
+    plan = Plan(path)
+    description = f"from {source:03}" + (f" as '{name}'" if name is not None else '') + " with audio"
+    plan.add(dest, relocate(plan.read(source), source, dest, name), description)
+
+    copies = {track: (track_file(wave_path, source, track), track_file(wave_path, dest, track))
+              for track in TRACKS if os.path.isfile(track_file(wave_path, source, track))}
+    removed = [track for track in TRACKS
+               if track not in copies and os.path.isfile(track_file(wave_path, dest, track))]
+    sizes = {track: os.path.getsize(src) for track, (src, _) in copies.items()}
+    result = {'entry': plan.entries[dest], 'tracks': sizes, 'removed': removed,
+              'bytes': sum(sizes.values()), 'seconds': 0.0}
+    if dry_run:
+        return result
+
+    lock = threading.Lock()
+    done = 0
+
+    def report(n):
+        nonlocal done
+        with lock:
+            done += n
+            if progress:
+                progress(done, result['bytes'])
+
+    def copy(item):
+        src, dst = item
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = f'{dst}.{os.getpid()}.tmp'
+        try:
+            copy_file(src, tmp, report)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return tmp, dst
+
+    start = time.perf_counter()
+    # dest stays locked from here, so nobody saves it between the WAVs and the patch
+    with CardLock(plan.path, [dest]):
+        check_latest(plan.path, dest, *plan.entries[dest]['expected'])
+        with stats.timer('audio.clone'):
+            with ThreadPoolExecutor(max_workers=len(copies) or 1) as executor:
+                futures = [executor.submit(copy, item) for item in copies.values()]
+            failed = [future.exception() for future in futures if future.exception()]
+            if failed:
+                for future in futures:
+                    if not future.exception():
+                        os.remove(future.result()[0])
+                raise failed[0]
+
+            for future in futures:
+                os.replace(*future.result())
+            for track in removed:
+                os.remove(track_file(wave_path, dest, track))
+            plan.execute()
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def format_duration(seconds):
+    """Seconds -> m:ss.s"""
+    minutes, seconds = divmod(seconds, 60)
+    return f'{int(minutes)}:{seconds:04.1f}'
+
+
+def format_size(size):
+    return f'{size / 2**20:.1f} MB' if size >= 2**20 else f'{size / 2**10:.0f} KB'
+
+
+class WaveIndex:
+    """
+    Per-track WAV header info keyed by (slot, track), for the WAVE folder
+    next to the current DATA folder. Entries hold 'file', 'mtime' and
+    'size' (bytes on the card) plus the header fields, or an 'error'.
+    """
+
+    def __init__(self, cwd=None, wave_path=None):
+        self.cwd = cwd
+        self.wave_path = wave_path
+        self.entries = {}  # (slot, track) -> entry dict
+        self.lock = threading.Lock()
+        self._path = None
+
+    @property
+    def path(self):
+        return self.wave_path or wave_dir(self.cwd or Memory.cwd)
+
+    def _check_path(self, path):
+        # Called with the lock held; a different WAVE folder empties the index
+        if path != self._path:
+            self.entries.clear()
+            self._path = path
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def cache_file(self, path=None):
+        """Where the index for a WAVE folder is persisted (outside the card)"""
+        key = hashlib.sha1(os.path.abspath(path or self.path).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(CACHE_DIR, f'audio-{key}.json')
+
+    def load(self):
+        """Load the persisted index for the current path; returns the number of entries loaded"""
+        path = self.path
+        try:
+            with open(self.cache_file(path), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get('path') != os.path.abspath(path):
+            return 0
+
+        entries = {}
+        for key, entry in data.get('entries', {}).items():
+            slot, track = key.split('_')
+            entries[int(slot), int(track)] = entry
+        with self.lock:
+            self._path = path
+            self.entries = entries
+        return len(entries)
+
+    def save(self):
+        """Persist the index for the current path (written atomically)"""
+        path = self.path
+        with self.lock:
+            if path != self._path:
+                return
+            data = {
+                'path': os.path.abspath(path),
+                'entries': {track_folder(*key): entry for key, entry in self.entries.items()},
+            }
+        cache_file = self.cache_file(path)
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass
+
+    def scan(self, slots=range(100), workers=8):
+        """
+        Bring the entries for the given slots up to date with the card: every
+        track file is stat'ed, and only new or changed ones have their header
+        read. Returns the number of headers read.
+        """
+        path = self.path
+        try:
+            folders = {entry.name for entry in os.scandir(path) if entry.is_dir()}
+        except OSError:
+            folders = set()
+        with self.lock:
+            self._check_path(path)
+            known = dict(self.entries)
+
+        def run(key):
+            file = track_file(path, *key)
+            try:
+                st = os.stat(file)
+            except OSError:
+                return key, None, False
+            entry = known.get(key)
+            if entry is not None and (entry['mtime'], entry['size']) == (st.st_mtime_ns, st.st_size):
+                return key, entry, False
+            entry = {'file': file, 'mtime': st.st_mtime_ns, 'size': st.st_size}
+            try:
+                entry.update(read_header(file))
+            except (OSError, ValueError) as e:
+                entry['error'] = str(e)
+            return key, entry, True
+
+        keys = [(slot, track) for slot in slots for track in TRACKS if track_folder(slot, track) in folders]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run, keys))
+
+        slots = set(slots)
+        with self.lock:
+            self._check_path(path)
+            for key in [key for key in self.entries if key[0] in slots]:
+                del self.entries[key]
+            for key, entry, _ in results:
+                if entry is not None:
+                    self.entries[key] = entry
+        read = sum(1 for _, _, fresh in results if fresh)
+        stats.count('audio.headers', read)
+        return read
+
+    def tracks(self, slot):
+        """Header info for the six tracks of a slot (None where there's no readable audio)"""
+        with self.lock:
+            entries = [self.entries.get((slot, track)) for track in TRACKS]
+        return [entry if entry is not None and 'error' not in entry else None for entry in entries]
+
+    def summary(self, slot):
+        """{'tracks', 'duration', 'size'} for a slot with audio, or None"""
+        entries = [entry for entry in self.tracks(slot) if entry is not None]
+        if not entries:
+            return None
+        return {
+            'tracks': len(entries),
+            'duration': max(entry['duration'] for entry in entries),
+            'size': sum(entry['size'] for entry in entries),
+        }
+
+    def attach(self, m):
+        """Give a Memory's tracks their audio info (see Track.duration etc.)"""
+        m.audio = self.tracks(m.slot)
+        return m
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the recorded loops on the RC-600")
+    parser.add_argument('--data', help=DATA_HELP)
+    parser.add_argument('--wave', help="WAVE folder (default: next to the DATA folder)")
+    parser.add_argument('--slots', type=parse_slots, default=range(100), help="slot range, e.g. 0-99")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--clone', nargs=2, type=int, metavar=('SOURCE', 'DEST'),
+                        help="copy slot SOURCE to DEST together with its recorded loops")
+    parser.add_argument('--name', help="name for the cloned patch (default: keep the source's name)")
+    parser.add_argument('--dry-run', action='store_true', help="show what --clone would copy without writing")
+    args = parser.parse_args(argv)
+
+    data_path = args.data or default_data_path()
+    if args.clone:
+        return clone_main(data_path, args)
+    index = WaveIndex(data_path, args.wave)
+    index.load()
+
+    start = time.perf_counter()
+    read = index.scan(args.slots, args.workers)
+    elapsed = time.perf_counter() - start
+
+    total = 0
+    for slot in args.slots:
+        for track, entry in zip(TRACKS, index.tracks(slot)):
+            if entry is None:
+                continue
+            total += entry['size']
+            print(f"{slot:03} track {track}: {format_duration(entry['duration'])}  "
+                  f"{entry['sample_rate']} Hz {entry['channels']}ch {entry['bits']}-bit  {format_size(entry['size'])}")
+    for (slot, track), entry in sorted(index.entries.items()):
+        if 'error' in entry:
+            print(f"{slot:03} track {track}: {entry['error']}")
+
+    print(f"{len(index.entries)} track files in {index.path}, {format_size(total)} "
+          f"({read} headers read in {elapsed:.2f}s)")
+    index.save()
+    return 0
+
+
+def clone_main(data_path, args):
+    source, dest = args.clone
+    start = time.perf_counter()
+
+    def progress(done, total):
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed / 2**20 if elapsed else 0
+        print(f"\r{format_size(done)} of {format_size(total)} ({rate:.0f} MB/s)", end='', flush=True)
+
+    try:
+        result = clone_slot(data_path, source, dest, args.name, args.wave, progress, args.dry_run)
+    except (OSError, ValueError) as e:
+        print(f"\nClone failed: {e}")
+        return 1
+
+    entry = result['entry']
+    tracks = ', '.join(f"{track} ({format_size(size)})" for track, size in result['tracks'].items()) or "none"
+    print(f"\n{'Would copy' if args.dry_run else 'Copied'} {source:03} -> {dest:03}: "
+          f"patch to {os.path.basename(entry['file'])}{' (unchanged)' if entry['content'] is None else ''}, "
+          f"tracks {tracks}")
+    if result['removed']:
+        print(f"Recordings removed from {dest:03} tracks {', '.join(map(str, result['removed']))}")
+    if result['seconds']:
+        print(f"{format_size(result['bytes'])} in {result['seconds']:.2f}s "
+              f"({result['bytes'] / result['seconds'] / 2**20:.0f} MB/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+RC-600 batch renames
+Streams a names CSV, groups its rows by slot and validates every name
+against the 12-character NAME block before touching the card. Each slot
+then gets a single read-modify-write on a worker pool; problems are
+reported per CSV row without stopping the rest of the batch.
+"""
+
+import csv
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import rc600_stats as stats
+from rc600_names import rename, validate_name
+from rc600_patch_manager import Memory
+
+
+def group_rows(rows, path):
+    """
+    Group (line, row) pairs by (DATA path, slot); the last row for a slot wins.
+    Returns ({(path, slot): (line, name)}, errors, superseded) where errors
+    are (line, slot, message) tuples for rejected rows and superseded lists
+    the lines overridden by a later row for the same slot.
+    """
+    groups = {}
+    errors = []
+    superseded = []
+    for line, row in rows:
+        try:
+            slot = int(row.get('Banco') or '')
+        except ValueError:
+            errors.append((line, None, f"invalid Banco {row.get('Banco')!r}"))
+            continue
+        name = row.get('ShortName')
+        error = validate_name(name) if name is not None else "missing ShortName"
+        if error:
+            errors.append((line, slot, error))
+            continue
+
+        key = (row.get('Card') or path, slot)
+        if key in groups:
+            superseded.append(groups[key][0])
+        groups[key] = (line, name.rstrip())
+    return groups, errors, superseded
+
+
+def read_rows(csv_file):
+    """Yield (line number, row) from a CSV without loading it all"""
+    with open(csv_file, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+
+class BatchResult:
+    """Outcome of a batch: one plan entry per slot plus row-level errors"""
+
+    def __init__(self):
+        self.entries = []
+        self.errors = []
+        self.superseded = []
+        self.lock = threading.Lock()
+
+    @property
+    def writes(self):
+        return [entry for entry in self.entries if entry['content'] is not None]
+
+    @property
+    def unchanged(self):
+        return [entry for entry in self.entries if entry['content'] is None]
+
+    def __str__(self):
+        lines = []
+        for entry in sorted(self.entries, key=lambda entry: entry['line']):
+            if entry['content'] is None:
+                lines.append(f"  skip  {entry['slot']:03} (unchanged) {entry['description']}")
+            else:
+                lines.append(f"  write {entry['slot']:03} -> {entry['file']} "
+                             f"(count {entry['count']:04X}) {entry['description']}")
+        for line, slot, message in sorted(self.errors, key=lambda error: error[0]):
+            lines.append(f"  error line {line}" + (f" (slot {slot:03})" if slot is not None else "") + f": {message}")
+        lines.append(f"{len(self.writes)} writes, {len(self.unchanged)} unchanged, {len(self.errors)} row errors"
+                     + (f", {len(self.superseded)} rows superseded by later rows" if self.superseded else ""))
+        return '\n'.join(lines)
+
+
+def rename_from_csv(csv_file, path=None, workers=8, dry_run=False):
+    """
+    Apply a names CSV (Banco, ShortName and an optional Card column with a
+    DATA path) with one read-modify-write per slot. Returns a BatchResult.
+    """
+    result = BatchResult()
+    groups, result.errors, result.superseded = group_rows(read_rows(csv_file), path or Memory.cwd)
+
+    def run(item):
+        (card, slot), (line, name) = item
+        try:
+            entry = rename(card, slot, name, dry_run)
+        except Exception as e:
+            with result.lock:
+                result.errors.append((line, slot, str(e)))
+            return
+        with result.lock:
+            result.entries.append(dict(entry, line=line))
+
+    with stats.timer('batch.rename'):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(run, groups.items()))
+    return result
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+RC-600 benchmarks
+Run with: python3 rc600_bench.py <benchmark> [options]
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+IMPORT_PROBE = (
+    "import sys, time; t = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - t, 'textual' in sys.modules, 'mido' in sys.modules)"
+)
+
+
+def bench_midi(count=200000, size=4096, batch_interval=1000):
+    """Push messages through a mock port into the monitor and drain in batches"""
+    from rc600_midi import MidiMonitor, MockPort, sample_messages
+
+    port = MockPort()
+    monitor = MidiMonitor(port, size=size).open()
+    messages = itertools.cycle(sample_messages())
+
+    drained = 0
+    start = time.perf_counter()
+    for i in range(count):
+        port.send(next(messages))
+        if i % batch_interval == 0:
+            drained += len(monitor.drain())
+    drained += len(monitor.drain())
+    elapsed = time.perf_counter() - start
+
+    stats = monitor.stats()
+    print(f"midi: {count} messages in {elapsed:.3f}s ({count / elapsed:,.0f} msg/s)")
+    print(f"      kept {drained}, filtered {stats['filtered']}, dropped {stats['dropped']}")
+
+
+def bench_clock(bpm=120.0, seconds=3.0, jitter_ms=0.5, drop_rate=0.01):
+    """Analyze a synthetic clock with known tempo, jitter and dropouts"""
+    from rc600_midi import ClockAnalyzer, ClockMonitor, MockPort, SyntheticClock, format_clock_stats
+
+    port = MockPort("Synthetic clock")
+    monitor = ClockMonitor(port, ClockAnalyzer(reference_bpm=bpm)).open()
+    generator = SyntheticClock(port, bpm, jitter_ms=jitter_ms, drop_rate=drop_rate, seed=600)
+    generator.start()
+    time.sleep(seconds)
+    generator.stop()
+    monitor.close()
+
+    print(f"clock: {generator.sent} ticks sent at {bpm} BPM, jitter {jitter_ms}ms, drop rate {drop_rate:.0%}")
+    print(f"       {format_clock_stats(monitor.analyzer.snapshot())}")
+
+
+def measure_import(module, runs=5):
+    """Import a module in fresh interpreters; returns (median seconds, textual loaded, mido loaded)"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_PROBE.format(module=module)],
+            cwd=here, capture_output=True, text=True, check=True
+        ).stdout.split()
+        samples.append(float(output[0]))
+    return statistics.median(samples), output[1] == 'True', output[2] == 'True'
+
+
+def bench_startup(data=None, runs=5):
+    """Import time of the core library and the TUI, and time to the first patch names"""
+    for module in ('rc600_patch_manager', 'rc600_index', 'rc600_tui'):
+        seconds, textual, midi = measure_import(module, runs)
+        loaded = ', '.join(name for name, flag in (('textual', textual), ('mido', midi)) if flag) or 'none'
+        print(f"startup: import {module:<20} {seconds * 1000:7.1f} ms (median of {runs}; loads {loaded})")
+
+    if not data:
+        print("startup: pass --data to time the first patch list render")
+        return
+
+    from rc600_index import SlotIndex
+    from rc600_patch_manager import Memory
+
+    index = SlotIndex(data)
+    index.cache_file = lambda path=None: os.path.join(data, '.bench-index.json')
+    start = time.perf_counter()
+    index.rows(0, 100, ('name',))
+    cold = time.perf_counter() - start
+    index.save()
+
+    index = SlotIndex(data)
+    index.cache_file = lambda path=None: os.path.join(data, '.bench-index.json')
+    start = time.perf_counter()
+    index.load()
+    index.rows(0, 100, ('name',), validate=False)
+    persisted = time.perf_counter() - start
+    os.remove(os.path.join(data, '.bench-index.json'))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for slot in range(100):
+            try:
+                Memory(slot, data).name
+            except Exception:
+                pass
+    full = time.perf_counter() - start
+
+    print(f"startup: 100 names via Memory(i)        {full * 1000:7.1f} ms")
+    print(f"startup: 100 names via partial parse    {cold * 1000:7.1f} ms")
+    print(f"startup: 100 names via persisted index  {persisted * 1000:7.1f} ms")
+
+
+def bench_setlist(data=None, songs=40):
+    """Build a setlist by parsing and re-saving each patch vs relocating bank bytes"""
+    if not data:
+        print("setlist: pass --data with a DATA folder to copy from")
+        return
+
+    from rc600_patch_manager import Memory
+    from rc600_setlist import build_setlist
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'DATA')
+        shutil.copytree(data, path)
+        entries = [((slot * 7) % 99 + 1, f'SONG {slot:02}') for slot in range(songs)]
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for slot, (source, name) in enumerate(entries, 1):
+                mem = Memory(source, path)
+                mem.name = name
+                mem.save(slot=slot)
+        parsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_setlist(entries, path)
+        relocated = time.perf_counter() - start
+
+    print(f"setlist: {songs} songs via parse + save    {parsed * 1000:7.1f} ms")
+    print(f"setlist: {songs} songs via byte relocation {relocated * 1000:7.1f} ms")
+
+
+def bench_names(data=None):
+    """Decode every name with full Memory parses vs the bulk NAME-region codec"""
+    if not data:
+        print("names: pass --data with a DATA folder")
+        return
+
+    from rc600_names import read_names
+    from rc600_patch_manager import Memory
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for slot in range(100):
+            try:
+                Memory(slot, data).name
+            except Exception:
+                pass
+    parsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    names = read_names(data)
+    bulk = time.perf_counter() - start
+
+    print(f"names: {len(names)} names via Memory(i).name {parsed * 1000:7.1f} ms")
+    print(f"names: {len(names)} names via read_names     {bulk * 1000:7.1f} ms")
+
+
+def bench_scan(data=None):
+    """List names, BPM and counts with full Memory parses vs the mmap scanner"""
+    if not data:
+        print("scan: pass --data with a DATA folder")
+        return
+
+    from rc600_patch_manager import Memory
+    from rc600_scan import scan
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for slot in range(100):
+            try:
+                m = Memory(slot, data)
+                m.name, m.bpm, m.count
+            except Exception:
+                pass
+    parsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scan(data, range(100), ('name', 'bpm'), workers=1)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = scan(data, range(100), ('name', 'bpm'))
+    threaded = time.perf_counter() - start
+
+    fallbacks = sum(1 for row in rows if row.get('parsed'))
+    print(f"scan: 100 slots via Memory(i)        {parsed * 1000:7.1f} ms")
+    print(f"scan: 100 slots via scan, 1 worker   {serial * 1000:7.1f} ms")
+    print(f"scan: 100 slots via scan, 8 workers  {threaded * 1000:7.1f} ms ({fallbacks} fell back to a full parse)")
+
+
+def bench_audio(data=None):
+    """Index the WAVE folder next to DATA: cold scan vs an incremental re-scan"""
+    if not data:
+        print("audio: pass --data with a DATA folder")
+        return
+
+    from rc600_audio import WaveIndex
+
+    index = WaveIndex(data)
+    start = time.perf_counter()
+    read = index.scan()
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reread = index.scan()
+    warm = time.perf_counter() - start
+
+    print(f"audio: cold scan        {cold * 1000:7.1f} ms ({read} headers read from {index.path})")
+    print(f"audio: re-scan          {warm * 1000:7.1f} ms ({reread} headers re-read)")
+
+
+def bench_load(data=None, slots=200):
+    """Parse a whole card serially with Memory(i) vs load_card on a process pool"""
+    if not data:
+        print("load: pass --data with a DATA folder")
+        return
+
+    from rc600_card import load_card
+    from rc600_patch_manager import Memory
+
+    slots = range(slots)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for slot in slots:
+            try:
+                Memory(slot, data)
+            except Exception:
+                pass
+    parsed = time.perf_counter() - start
+    print(f"load: {len(slots)} slots via Memory(i)           {parsed * 1000:7.1f} ms")
+
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        records = load_card(data, slots, workers)
+        elapsed = time.perf_counter() - start
+        errors = sum(1 for record in records if 'error' in record)
+        print(f"load: {len(slots)} slots via load_card, {workers:2d} workers {elapsed * 1000:7.1f} ms ({errors} errors)")
+
+
+def bench_loudness(data=None, slots=range(20)):
+    """Analyze the loops of a few slots on one thread vs a small pool"""
+    if not data:
+        print("loudness: pass --data with a DATA folder")
+        return
+
+    from rc600_loudness import analyze_card, np
+
+    if np is None:
+        print("loudness: numpy is not installed")
+        return
+
+    start = time.perf_counter()
+    analyses = analyze_card(data, slots, workers=1)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analyze_card(data, slots, workers=4)
+    threaded = time.perf_counter() - start
+
+    seconds = sum(analysis.get('duration', 0) for analysis in analyses.values())
+    print(f"loudness: {len(analyses)} tracks ({seconds:.0f}s of audio), 1 worker   {serial * 1000:7.1f} ms")
+    print(f"loudness: {len(analyses)} tracks ({seconds:.0f}s of audio), 4 workers  {threaded * 1000:7.1f} ms")
+
+
+def bench_sync(data=None, changed=3):
+    """Push a copy with a few renamed slots: plain folder copy vs hash sync, cold and with cached hashes"""
+    if not data:
+        print("sync: pass --data with a DATA folder to copy from")
+        return
+
+    from rc600_names import rename
+    from rc600_sync import HashCache, plan_sync
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, dest = os.path.join(tmp, 'SOURCE'), os.path.join(tmp, 'DEST')
+        shutil.copytree(data, source)
+        shutil.copytree(data, dest)
+        old = time.time() - 3600
+        for path in (source, dest):
+            for name in os.listdir(path):
+                os.utime(os.path.join(path, name), (old, old))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for slot in range(changed):
+                rename(source, slot, f'SYNC {slot}')
+
+        start = time.perf_counter()
+        shutil.copytree(source, os.path.join(tmp, 'COPY'))
+        copied = time.perf_counter() - start
+
+        source_cache, dest_cache = HashCache(source), HashCache(dest)
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            plan, _ = plan_sync(source_cache, dest_cache, source_cache.scan(), dest_cache.scan())
+            timings.append(time.perf_counter() - start)
+
+    files = len(os.listdir(data))
+    print(f"sync: plain copy of {files} bank files          {copied * 1000:7.1f} ms")
+    print(f"sync: hash and plan {len(plan.writes)} slots, cold        {timings[0] * 1000:7.1f} ms")
+    print(f"sync: hash and plan {len(plan.writes)} slots, cached      {timings[1] * 1000:7.1f} ms")
+
+
+BENCHMARKS = {
+    'audio': bench_audio,
+    'clock': bench_clock,
+    'load': bench_load,
+    'loudness': bench_loudness,
+    'midi': bench_midi,
+    'names': bench_names,
+    'scan': bench_scan,
+    'setlist': bench_setlist,
+    'startup': bench_startup,
+    'sync': bench_sync,
+}
+
+# Benchmarks that read a DATA folder (passed with --data)
+DATA_BENCHMARKS = {'audio', 'load', 'loudness', 'names', 'scan', 'setlist', 'startup', 'sync'}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RC-600 benchmarks")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS) + ['all'])
+    parser.add_argument('--data', help="DATA folder for benchmarks that read patches")
+    args = parser.parse_args(argv)
+
+    names = sorted(BENCHMARKS) if args.benchmark == 'all' else [args.benchmark]
+    for name in names:
+        if name in DATA_BENCHMARKS:
+            BENCHMARKS[name](data=args.data)
+        else:
+            BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
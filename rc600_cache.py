@@ -0,0 +1,193 @@
+"""
+RC-600 patch cache
+Parsed Memory objects shared between consumers (server, TUI, tools)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import rc600_stats as stats
+from rc600_patch_manager import Memory, get_latest
+
+# Measured cost of one parsed element (node, tag and text strings) in bytes
+ELEMENT_SIZE = 180
+
+
+def estimate_size(m):
+    """Approximate memory held by a parsed patch"""
+    return sum(1 for _ in m.root.iter()) * ELEMENT_SIZE
+
+
+class PatchCache:
+    """
+    Parsed patches keyed by slot, kept in least-recently-used order under a
+    memory budget (estimated from tree sizes; None for no limit). Pinned
+    slots, such as the patch on screen, and dirty patches (changed but not
+    saved) are never evicted. Evicted patches leave their bank bytes behind (a few KB each)
+    so they can be re-parsed without reading the card again.
+
+    Entries are revalidated against the slot's active bank and count, which
+    only costs reading the last line of the two bank files, so a stale
+    patch is never served. A dirty patch is served as is: its unsaved
+    changes win over the card until it is saved or invalidated.
+    """
+
+    def __init__(self, cwd=None, budget=16 * 2**20, raw_budget=2 * 2**20):
+        self.cwd = cwd
+        self.budget = budget
+        self.raw_budget = raw_budget
+        self.entries = OrderedDict()  # slot -> (Memory, size, content)
+        self.raw = OrderedDict()  # slot -> content of evicted patches
+        self.pinned = set()
+        self.size = 0
+        self.raw_size = 0
+        self.hits = self.misses = self.evictions = self.rehydrated = 0
+        self.lock = threading.Lock()
+        self._path = None
+
+    @property
+    def path(self):
+        return self.cwd or Memory.cwd
+
+    def _check_path(self):
+        # Called with the lock held; a different DATA folder empties the cache
+        if self.path != self._path:
+            self.entries.clear()
+            self.raw.clear()
+            self.size = self.raw_size = 0
+            self._path = self.path
+
+    def get(self, slot, validate=True):
+        """Return the Memory for a slot, parsing it only if it changed on disk"""
+        path = self.path
+        latest = get_latest(path, slot) if validate else None
+        with self.lock:
+            self._check_path()
+            entry = self.entries.get(slot)
+            if entry is not None and (latest is None or entry[0].dirty or latest == (entry[0].seq, entry[0].count)):
+                self.entries.move_to_end(slot)
+                self.hits += 1
+                stats.count('cache.hit')
+                return entry[0]
+            self.misses += 1
+            raw = self.raw.get(slot)
+        stats.count('cache.miss')
+
+        bank, count = latest or get_latest(path, slot)
+        if raw is not None and raw[:2] == (bank, count):
+            content = raw[2]
+            with self.lock:
+                self.rehydrated += 1
+        else:
+            with stats.timer('file.read'):
+                with open(os.path.join(path, f'MEMORY{slot:03}{bank}.RC0'), 'rb') as f:
+                    content = f.read()
+        m = Memory.from_bytes(slot, content, bank, count, path)
+        self.put(slot, m, content)
+        return m
+
+    def put(self, slot, m, content=None):
+        """Add a parsed patch; `content` is the bank's bytes, kept for re-hydration after eviction"""
+        size = estimate_size(m)
+        with self.lock:
+            self._check_path()
+            self._discard(slot)
+            self.entries[slot] = (m, size, (m.seq, m.count, content) if content is not None else None)
+            self.size += size
+            self._evict()
+
+    def peek(self, slot):
+        """Return the cached Memory for a slot without touching the disk"""
+        with self.lock:
+            entry = self.entries.get(slot)
+            return entry[0] if entry is not None else None
+
+    def dirty_slots(self):
+        """Slots of cached patches with unsaved changes"""
+        with self.lock:
+            return {slot for slot, entry in self.entries.items() if entry[0].dirty}
+
+    def invalidate(self, slot=None):
+        with self.lock:
+            if slot is None:
+                self.entries.clear()
+                self.raw.clear()
+                self.size = self.raw_size = 0
+            else:
+                self._discard(slot)
+
+    def pin(self, slot):
+        with self.lock:
+            self.pinned.add(slot)
+
+    def unpin(self, slot):
+        with self.lock:
+            self.pinned.discard(slot)
+            self._evict()
+
+    def set_pinned(self, slots):
+        """Replace the set of pinned slots"""
+        with self.lock:
+            self.pinned = set(slots)
+            self._evict()
+
+    def _discard(self, slot):
+        entry = self.entries.pop(slot, None)
+        if entry is not None:
+            self.size -= entry[1]
+        raw = self.raw.pop(slot, None)
+        if raw is not None:
+            self.raw_size -= len(raw[2])
+
+    def _evict(self):
+        if self.budget is None:
+            return
+        for slot in list(self.entries):
+            if self.size <= self.budget:
+                break
+            if slot in self.pinned or self.entries[slot][0].dirty:
+                continue
+            m, size, raw = self.entries.pop(slot)
+            self.size -= size
+            self.evictions += 1
+            stats.count('cache.evict')
+            if raw is not None:
+                self.raw[slot] = raw
+                self.raw_size += len(raw[2])
+        while self.raw and self.raw_size > self.raw_budget:
+            _, raw = self.raw.popitem(last=False)
+            self.raw_size -= len(raw[2])
+
+    def info(self):
+        """Counters and sizes for display"""
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'pinned': len(self.pinned & set(self.entries)),
+                'size': self.size,
+                'budget': self.budget,
+                'raw': len(self.raw),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'rehydrated': self.rehydrated,
+            }
+
+    def describe(self):
+        info = self.info()
+        budget = f"{info['budget'] / 2**20:.0f} MB" if info['budget'] is not None else "unlimited"
+        lookups = info['hits'] + info['misses']
+        hit_rate = f"{info['hits'] / lookups:.0%}" if lookups else "-"
+        return (f"{info['entries']} patches ({info['pinned']} pinned), {info['size'] / 2**20:.1f} MB of {budget}\n"
+                f"hits {info['hits']}, misses {info['misses']} (hit rate {hit_rate}), "
+                f"evictions {info['evictions']}, re-hydrated from bytes {info['rehydrated']} "
+                f"({info['raw']} kept as bytes)")
+
+    def __contains__(self, slot):
+        with self.lock:
+            return slot in self.entries
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
@@ -0,0 +1,101 @@
+"""
+RC-600 full-card loader
+Parses every slot on a process pool. Workers send back compact, picklable
+records (name, BPM, track parameters, input routing and per-subtree
+hashes) instead of ElementTrees; a full Memory is rebuilt in the parent
+only for the slots that need one.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import rc600_stats as stats
+from rc600_names import decode
+from rc600_patch_manager import Memory, get_latest, parse_rc600_tree
+
+
+def subtree_hash(element):
+    """
+    Hash of the tags and values under an element. Attributes (the slot ids of
+    ifx/tfx) and whitespace are left out, so equal settings in different
+    slots hash the same.
+    """
+    values = ' '.join(f'{node.tag}={node.text.strip() if node.text else ""}' for node in element.iter())
+    return hashlib.blake2b(values.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def read_record(path, slot):
+    """
+    Parse a slot's active bank into a record: 'slot', 'bank', 'count',
+    'name', 'bpm', 'tracks' (one {param: value} dict per track), 'inputs'
+    (the Q routing bitmask of each track) and 'hashes' ({subtree: hash} for
+    every child of <mem> plus ifx and tfx).
+    """
+    bank, count = get_latest(path, slot)
+    root = parse_rc600_tree(os.path.join(path, f'MEMORY{slot:03}{bank}.RC0')).getroot()
+    mem = root.find('mem')
+
+    name = decode(child.text for child in mem.find('NAME'))
+    master = mem.find('MASTER/A')
+    tracks = [{param.tag: int(param.text) for param in mem.find(f'TRACK{n}')} for n in range(1, 7)]
+
+    hashes = {child.tag: subtree_hash(child) for child in mem}
+    for tag in ('ifx', 'tfx'):
+        element = root.find(tag)
+        if element is not None:
+            hashes[tag] = subtree_hash(element)
+
+    return {
+        'slot': slot,
+        'bank': bank,
+        'count': count,
+        'name': name,
+        'bpm': int(master.text) / 10.0 if master is not None else None,
+        'tracks': tracks,
+        'inputs': [track.get('Q', 0) for track in tracks],
+        'hashes': hashes,
+    }
+
+
+def _read_records(path, slots):
+    """Worker entry point: records for a chunk of slots, errors as {'slot', 'error'}"""
+    records = []
+    for slot in slots:
+        try:
+            records.append(read_record(path, slot))
+        except Exception as e:
+            records.append({'slot': slot, 'error': str(e)})
+    return records
+
+
+def load_card(path=None, slots=range(100), workers=None):
+    """
+    Records for every slot in slot order, parsed on `workers` processes
+    (default: one per core). workers=1 parses in this process.
+    """
+    path = path or Memory.cwd
+    slots = list(slots)
+    workers = workers or os.cpu_count() or 1
+
+    with stats.timer('card.load'):
+        if workers == 1:
+            return _read_records(path, slots)
+
+        # A few chunks per worker keeps the pool busy without pickling per slot
+        size = max(1, len(slots) // (workers * 4))
+        chunks = [slots[i:i + size] for i in range(0, len(slots), size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return [record for records in executor.map(_read_records, [path] * len(chunks), chunks)
+                    for record in records]
+
+
+def load_memory(record, path=None):
+    """
+    Rebuild the full Memory for a record. Raises ValueError if the slot was
+    saved since the record was read.
+    """
+    m = Memory(record['slot'], path or Memory.cwd)
+    if (m.seq, m.count) != (record['bank'], record['count']):
+        raise ValueError(f"memory {record['slot']:03} changed since it was loaded")
+    return m
@@ -0,0 +1,242 @@
+"""
+RC-600 card integrity check
+Scans both bank files of every slot on a worker pool and reports
+truncated files, missing or unparsable counts, duplicate counts or
+counts too far apart to tell which is newer, XML errors and banks whose count is ahead of a corrupt body.
+With --repair, a slot whose active bank is broken falls back to its
+healthy bank.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import rc600_stats as stats
+from rc600_lock import slot_lock
+from rc600_names import NAME_LENGTH
+from rc600_patch_manager import COUNT_MODULO, DATA_HELP, default_data_path, from_rc600_xml, newest, next_count, parse_slots
+
+COUNT_LINE = re.compile(rb'^<count>([0-9A-Fa-f]+)</count>\s*$')
+
+ERROR = 'error'
+WARNING = 'warning'
+
+
+def check_bank(path, slot, bank):
+    """
+    Check one bank file. Returns a dict with 'bank', 'file', 'exists',
+    'count' (None if unreadable), 'body_ok' and a list of 'problems'.
+    """
+    file = os.path.join(path, f'MEMORY{slot:03}{bank}.RC0')
+    result = {'bank': bank, 'file': file, 'exists': False, 'count': None, 'body_ok': False, 'problems': []}
+    problems = result['problems']
+
+    with stats.timer('fsck.read'):
+        try:
+            with open(file, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return result
+        except OSError as e:
+            result['exists'] = True
+            problems.append(f'unreadable: {e.strerror}')
+            return result
+    result['exists'] = True
+
+    if not content.strip():
+        problems.append('empty file')
+        return result
+
+    body, _, last_line = content.rstrip(b'\r\n').rpartition(b'\n')
+    match = COUNT_LINE.match(last_line)
+    if match:
+        result['count'] = int(match.group(1), 16)
+    else:
+        problems.append('missing or unparsable <count> line')
+        body = content
+
+    if not body.rstrip().endswith(b'</database>'):
+        problems.append(f'truncated ({len(content)} bytes, no closing </database>)')
+        return result
+
+    with stats.timer('fsck.parse'):
+        try:
+            text = body.decode('utf-8')
+            root = ET.fromstring(''.join(from_rc600_xml(line) for line in text.splitlines(True)))
+        except UnicodeDecodeError as e:
+            problems.append(f'not UTF-8 at byte {e.start}')
+            return result
+        except ET.ParseError as e:
+            problems.append(f'XML error: {e}')
+            return result
+
+    mem = root.find('mem')
+    if mem is None:
+        problems.append('no <mem> element')
+        return result
+    name = mem.find('NAME')
+    if name is None or len(name) != NAME_LENGTH:
+        problems.append(f'NAME block should have {NAME_LENGTH} characters')
+    missing = [f'TRACK{n}' for n in range(1, 7) if mem.find(f'TRACK{n}') is None]
+    if missing:
+        problems.append(f'missing {", ".join(missing)}')
+    if mem.find('MASTER') is None:
+        problems.append('missing MASTER')
+
+    result['body_ok'] = not problems or problems == ['missing or unparsable <count> line']
+    return result
+
+
+def check_slot(path, slot):
+    """
+    Check both banks of a slot. Returns a dict with 'slot', 'banks',
+    'active' (the bank get_latest would pick), 'fallback' (the healthy
+    bank to repair from, if the active one is broken) and 'problems' as
+    (severity, message) tuples.
+    """
+    banks = [check_bank(path, slot, bank) for bank in 'AB']
+    counted = [bank for bank in banks if bank['count'] is not None]
+    latest = newest({bank['bank']: bank['count'] for bank in counted})
+    active = next((bank for bank in banks if bank['bank'] == latest), None)
+
+    # A broken standby bank is harmless until it is loaded; the next save overwrites it
+    problems = []
+    for bank in banks:
+        severity = ERROR if bank is active and not bank['body_ok'] else WARNING
+        for problem in bank['problems']:
+            problems.append((severity, f"bank {bank['bank']}: {problem}"))
+
+    present = [bank for bank in banks if bank['exists']]
+    if not present:
+        problems.append((WARNING, 'no bank files (empty slot)'))
+        return {'slot': slot, 'banks': banks, 'active': None, 'fallback': None, 'problems': problems}
+    if len(present) == 1:
+        problems.append((WARNING, f"only bank {present[0]['bank']} present"))
+
+    if len(counted) == 2:
+        a, b = counted[0]['count'], counted[1]['count']
+        if a == b:
+            problems.append((WARNING, f'both banks have count {a:04X}'))
+        elif (a - b) % COUNT_MODULO == COUNT_MODULO // 2:
+            problems.append((WARNING, f'counts {a:04X}/{b:04X} are half the count range apart; bank A is taken as newer'))
+
+    healthy = [bank for bank in banks if bank['body_ok']]
+    fallback = None
+    if active is None or not active['body_ok']:
+        newest_healthy = newest({bank['bank']: bank['count'] or 0 for bank in healthy})
+        fallback = next((bank for bank in healthy if bank['bank'] == newest_healthy), None)
+        if active is not None:
+            message = f"active bank {active['bank']} (count {active['count']:04X}) is ahead of a corrupt body"
+        else:
+            message = 'no bank has a valid count'
+        if fallback is not None:
+            message += f"; bank {fallback['bank']} is healthy"
+        else:
+            message += '; no healthy bank to fall back to'
+        problems.append((ERROR, message))
+
+    return {
+        'slot': slot,
+        'banks': banks,
+        'active': active['bank'] if active else None,
+        'fallback': fallback['bank'] if fallback else None,
+        'problems': problems,
+    }
+
+
+def check_card(path, slots=range(100), workers=8):
+    """Check every slot on a thread pool; returns the slot reports in slot order"""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda slot: check_slot(path, slot), slots))
+
+
+def repair_slot(path, report, backup_dir=None):
+    """
+    Make the healthy bank active again: its body is written over the broken
+    bank with the count after the slot's newest, exactly like a save.
+    The overwritten file is copied to backup_dir first, and the slot is
+    locked like for a save. Returns the new (bank, count).
+    """
+    with slot_lock(path, report['slot']):
+        return _repair(report, backup_dir)
+
+
+def _repair(report, backup_dir):
+    source = next(bank for bank in report['banks'] if bank['bank'] == report['fallback'])
+    target = next(bank for bank in report['banks'] if bank['bank'] != report['fallback'])
+
+    with open(source['file'], 'rb') as f:
+        content = f.read()
+    if source['count'] is not None:
+        content = content.rstrip(b'\r\n').rpartition(b'\n')[0]
+    body = content.rstrip(b'\r\n') + b'\n'
+
+    counts = {bank['bank']: bank['count'] for bank in report['banks'] if bank['count'] is not None}
+    count = next_count(counts.get(newest(counts)))
+
+    if backup_dir and target['exists']:
+        os.makedirs(backup_dir, exist_ok=True)
+        shutil.copy2(target['file'], os.path.join(backup_dir, os.path.basename(target['file'])))
+
+    tmp_file = f"{target['file']}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(body)
+        f.write('<count>{:04X}</count>'.format(count).encode('ascii'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, target['file'])
+    return target['bank'], count
+
+
+def count_problems(reports, severity):
+    return sum(1 for report in reports for problem_severity, _ in report['problems'] if problem_severity == severity)
+
+
+def format_report(report):
+    lines = []
+    for severity, message in report['problems']:
+        lines.append(f"  {report['slot']:03} {severity.upper():<7} {message}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the RC-600 memory files for corruption")
+    parser.add_argument('--data', help=DATA_HELP)
+    parser.add_argument('--slots', type=parse_slots, default=range(100), help="slot range, e.g. 0-199")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--repair', action='store_true', help="fall back to the healthy bank where the active one is broken")
+    parser.add_argument('--backup', default='rc600-fsck-backup', help="where --repair copies the files it overwrites")
+    args = parser.parse_args(argv)
+
+    data_path = args.data or default_data_path()
+
+    start = time.perf_counter()
+    reports = check_card(data_path, args.slots, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for report in reports:
+        if report['problems']:
+            print(format_report(report))
+    repairable = [report for report in reports if report['fallback']]
+    print(f"Checked {len(reports)} slots in {data_path} in {elapsed:.2f}s: "
+          f"{count_problems(reports, ERROR)} errors, {count_problems(reports, WARNING)} warnings, "
+          f"{len(repairable)} repairable")
+
+    if args.repair and repairable:
+        for report in repairable:
+            bank, count = repair_slot(data_path, report, args.backup)
+            print(f"Repaired {report['slot']:03}: bank {report['fallback']} copied to bank {bank} with count {count:04X}")
+            reports[reports.index(report)] = check_slot(data_path, report['slot'])
+        print(f"Overwritten files were copied to {args.backup}")
+        print(f"{count_problems(reports, ERROR)} errors left")
+
+    return 1 if count_problems(reports, ERROR) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+RC-600 slot index
+Paged, partial access to patch fields without building full ElementTrees,
+persisted between runs so patch names can be shown before touching the card
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import rc600_stats as stats
+from rc600_patch_manager import Memory, get_latest
+from rc600_scan import FIELDS, scan_slot
+
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'rc600-patch-manager'
+)
+
+
+def read_fields(path, slot, fields=FIELDS):
+    """Partial parse of a slot's active bank: bank, count and the requested fields"""
+    with stats.timer('index.read'):
+        return scan_slot(path, slot, fields)
+
+
+class SlotIndex:
+    """
+    Per-slot rows of lightweight fields (name, bpm, track input bitmasks),
+    filled on demand by partial parsing and revalidated against the slot's
+    active bank and count. Consumers page through it with rows(start, stop)
+    and only pay for the slots and fields they actually show.
+    """
+
+    def __init__(self, cwd=None, slots=range(100)):
+        self.cwd = cwd
+        self.slots = list(slots)
+        self.entries = {}  # slot -> row dict
+        self.lock = threading.Lock()
+        self._path = None
+
+    @property
+    def path(self):
+        return self.cwd or Memory.cwd
+
+    def __len__(self):
+        return len(self.slots)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def invalidate(self, slot):
+        with self.lock:
+            self.entries.pop(slot, None)
+
+    def cache_file(self, path=None):
+        """Where the index for a DATA folder is persisted (outside the card)"""
+        key = hashlib.sha1(os.path.abspath(path or self.path).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(CACHE_DIR, f'index-{key}.json')
+
+    def load(self):
+        """Load the persisted index for the current path; returns the number of rows loaded"""
+        path = self.path
+        try:
+            with open(self.cache_file(path), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get('path') != os.path.abspath(path):
+            return 0
+
+        entries = {int(slot): row for slot, row in data.get('entries', {}).items()}
+        with self.lock:
+            self._path = path
+            self.entries = entries
+        return len(entries)
+
+    def save(self):
+        """Persist the index for the current path (written atomically)"""
+        path = self.path
+        with self.lock:
+            if path != self._path:
+                return
+            data = {
+                'path': os.path.abspath(path),
+                'entries': {str(slot): row for slot, row in self.entries.items()},
+            }
+        cache_file = self.cache_file(path)
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass
+
+    def row(self, slot, fields=FIELDS, validate=True):
+        """Return a row for one slot with at least the requested fields"""
+        path = self.path
+        with self.lock:
+            if path != self._path:
+                self.entries.clear()
+                self._path = path
+            entry = self.entries.get(slot)
+
+        missing = [field for field in fields if entry is None or field not in entry]
+        if entry is not None and validate:
+            if get_latest(path, slot) != (entry['bank'], entry['count']):
+                entry, missing = None, list(fields)
+
+        if missing:
+            fresh = read_fields(path, slot, missing)
+            if entry is not None and (fresh['bank'], fresh['count']) == (entry['bank'], entry['count']):
+                entry = dict(entry, **fresh)
+            else:
+                entry = fresh
+            with self.lock:
+                self.entries[slot] = entry
+        return entry
+
+    def rows(self, start=0, stop=None, fields=('name',), validate=True):
+        """
+        Rows for slots[start:stop] containing only 'slot', 'bank', 'count'
+        and the requested fields. Unreadable slots get an 'error' entry.
+        """
+        result = []
+        for slot in self.slots[start:stop]:
+            try:
+                entry = self.row(slot, fields, validate)
+            except Exception as e:
+                result.append({'slot': slot, 'error': str(e)})
+                continue
+            row = {'slot': slot, 'bank': entry['bank'], 'count': entry['count']}
+            for field in fields:
+                row[field] = entry[field]
+            result.append(row)
+        return result
@@ -0,0 +1,323 @@
+"""
+RC-600 edit journal
+Every edit is recorded as field-level deltas: (slot, element path, old
+value, new value). Staging an operation sets its new values on the live
+Memory objects, marking them dirty, and apply() saves the dirty patches.
+undo()/redo() work on either side of that: undoing a staged operation
+puts the old values back in memory, undoing an applied one saves them
+again with a fresh count (the previous bank is never touched).
+
+If another process saved a slot since it was loaded, the save is rebased:
+the slot is read again and the journaled fields are set on top, unless
+the other writer changed one of those fields too.
+
+Deltas are kept compact: element paths are interned in one table and
+referenced by index, numeric values are stored as ints, and repeated
+edits of a field within one operation collapse into one delta.
+"""
+
+import copy
+import sys
+
+import rc600_stats as stats
+from rc600_names import encode
+from rc600_patch_manager import Memory, StaleBankError, Track
+
+OPERATION_LIMIT = 10000
+
+
+def pack(value):
+    """Store element text as an int when that round-trips (most RC-600 values are numbers)"""
+    if value is not None and value.isdigit() and str(int(value)) == value:
+        return int(value)
+    return value
+
+
+def unpack(value):
+    return str(value) if isinstance(value, int) else value
+
+
+def diff_elements(prefix, old, new):
+    """
+    {path: new text} for the leaves under `new` whose text differs from
+    the same leaf under `old`. Raises ValueError if the structures differ.
+    """
+    changes = {}
+    for child in new:
+        path = f'{prefix}/{child.tag}'
+        counterpart = old.find(child.tag)
+        if counterpart is None:
+            raise ValueError(f"{path} not found in the target")
+        if len(child):
+            changes.update(diff_elements(path, counterpart, child))
+        elif (child.text or '') != (counterpart.text or ''):
+            changes[path] = child.text
+    return changes
+
+
+def name_changes(m, name):
+    """Field changes that rename a Memory"""
+    name_element = m.root.find('mem/NAME')
+    return {f'mem/NAME/{child.tag}': str(code) for child, code in zip(name_element, encode(name, len(name_element)))}
+
+
+def track_changes(m, track_num, settings):
+    """Field changes for {Track attribute: value} settings of a track (1-6)"""
+    node = m.root.find(f'mem/TRACK{track_num}')
+    track = Track(copy.deepcopy(node))
+    for setting, value in settings.items():
+        setattr(track, setting, value)
+    return diff_elements(f'mem/TRACK{track_num}', node, track.node)
+
+
+def copy_changes(source, dest, paths):
+    """Field changes that copy the subtrees at `paths` (as for Memory.copy_to) from source to dest"""
+    changes = {}
+    for path in paths:
+        path = path[2:] if path.startswith('./') else path
+        source_node, dest_node = source.root.find(path), dest.root.find(path)
+        if source_node is None or dest_node is None:
+            raise ValueError(f"{path} not found")
+        changes.update(diff_elements(path, dest_node, source_node))
+    return changes
+
+
+class Operation:
+    """One journaled edit: a kind ('name', 'copy', 'track', ...), a description, info for display and deltas"""
+
+    __slots__ = ('kind', 'description', 'info', 'deltas', 'applied')
+
+    def __init__(self, kind, description, info, deltas):
+        self.kind = kind
+        self.description = description
+        self.info = info
+        self.deltas = deltas  # tuple of (slot, path id, old, new)
+        self.applied = False  # True once its values went to the card
+
+    @property
+    def slots(self):
+        return sorted({delta[0] for delta in self.deltas})
+
+    def __str__(self):
+        return f"{self.description} ({len(self.deltas)} field{'s' if len(self.deltas) != 1 else ''})"
+
+
+class Journal:
+    """
+    Operations in the order they were made. operations[:position] are in
+    effect (staged or applied); the rest can be redone.
+    """
+
+    def __init__(self, limit=OPERATION_LIMIT):
+        self.operations = []
+        self.position = 0
+        self.limit = limit
+        self.paths = []  # path id -> element path
+        self.path_ids = {}
+
+    def _path_id(self, path):
+        path_id = self.path_ids.get(path)
+        if path_id is None:
+            path_id = self.path_ids[path] = len(self.paths)
+            self.paths.append(path)
+        return path_id
+
+    def deltas(self, operation):
+        """The operation's deltas as (slot, path, old, new) with text values"""
+        return [(slot, self.paths[path_id], unpack(old), unpack(new)) for slot, path_id, old, new in operation.deltas]
+
+    @staticmethod
+    def value(m, path):
+        """Current value of a field, staged changes included"""
+        element = m.root.find(path)
+        if element is None:
+            raise ValueError(f"{path} not found in memory {m.slot:03}")
+        return element.text
+
+    def stage(self, kind, description, changes, info=None):
+        """
+        Record an operation from {Memory: {path: new text}} changes and set
+        the new values on those Memory objects, which should be the live
+        ones (e.g. from a PatchCache) so that the next apply() saves them.
+        Returns the Operation, or None if nothing would change.
+        """
+        deltas = {}
+        for m, fields in changes.items():
+            for path, new in fields.items():
+                old = self.value(m, path)
+                if old != new:
+                    deltas[(m.slot, self._path_id(path))] = (pack(old), pack(new))
+        if not deltas:
+            return None
+
+        for m, fields in changes.items():
+            for path, new in fields.items():
+                m.set_value(path, new)
+
+        operation = Operation(kind, description, info or {},
+                              tuple((slot, path_id, old, new) for (slot, path_id), (old, new) in deltas.items()))
+        del self.operations[self.position:]
+        self.operations.append(operation)
+        if len(self.operations) > self.limit:
+            del self.operations[:len(self.operations) - self.limit]
+        self.position = len(self.operations)
+        return operation
+
+    def staged(self, kind=None):
+        """Operations in effect that haven't been written yet"""
+        return [operation for operation in self.operations[:self.position]
+                if not operation.applied and (kind is None or operation.kind == kind)]
+
+    def staged_slots(self):
+        return {slot for operation in self.staged() for slot in operation.slots}
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self.operations)
+
+    def _by_slot(self, values):
+        by_slot = {}
+        for (slot, path_id), text in values.items():
+            by_slot.setdefault(slot, {})[self.paths[path_id]] = text
+        return by_slot
+
+    def _set(self, load, values):
+        """Set {(slot, path id): text} on the loaded Memory objects without saving"""
+        staged_slots = self.staged_slots()
+        for slot, fields in self._by_slot(values).items():
+            m = load(slot)
+            for path, text in fields.items():
+                m.set_value(path, text)
+            if slot not in staged_slots:
+                m.dirty = False  # back to what the card holds
+
+    def _write(self, load, values, expected):
+        """
+        Write {(slot, path id): text} to the card, one save per slot (none
+        for a patch that already holds the values and has no other changes).
+        `expected` has the text each field should have on the card, for
+        rebasing. Returns ({slot}, {slot: error message}).
+        """
+        expected = self._by_slot(expected)
+        written, errors = set(), {}
+        for slot, fields in sorted(self._by_slot(values).items()):
+            try:
+                m = load(slot)
+                for path, text in fields.items():
+                    m.set_value(path, text)
+                try:
+                    saved = m.save()
+                except StaleBankError:
+                    saved = self._rebase(m, fields, expected[slot])
+                if saved:
+                    written.add(slot)
+            except Exception as e:
+                errors[slot] = str(e)
+        return written, errors
+
+    @staticmethod
+    def _rebase(m, fields, expected):
+        """Reload a Memory saved elsewhere in the meantime and save `fields` on top of it"""
+        current = Memory(m.slot, m.cwd)
+        conflicts = [path for path, text in fields.items()
+                     if current.root.find(path) is None or current.root.find(path).text not in (expected[path], text)]
+        if conflicts:
+            raise StaleBankError(f"changed on the card since: {', '.join(conflicts[:5])}")
+        stats.count('save.rebased')
+        m.root, m.seq, m.count, m.xml_path = current.root, current.seq, current.count, current.xml_path
+        m.dirty = False
+        for path, text in fields.items():
+            m.set_value(path, text)
+        return m.save()
+
+    def _check(self, load, operation, expected):
+        """Raise ValueError if fields of the operation no longer hold the expected side (2: old, 3: new)"""
+        conflicts = []
+        memories = {slot: load(slot) for slot in operation.slots}
+        for delta in operation.deltas:
+            slot, path_id = delta[:2]
+            element = memories[slot].root.find(self.paths[path_id])
+            if element is None or element.text != unpack(delta[expected]):
+                conflicts.append(f"{slot:03} {self.paths[path_id]}")
+        if conflicts:
+            raise ValueError(f"changed on the card since: {', '.join(conflicts[:5])}")
+
+    def apply(self, load):
+        """
+        Write every staged operation; each slot is saved once, to its next
+        bank. `load(slot)` returns the slot's current Memory. Returns (applied
+        operations, {slot: error}); operations touching a failed slot stay staged.
+        """
+        staged = self.staged()
+        values, expected = {}, {}
+        for operation in staged:
+            for slot, path_id, old, new in operation.deltas:
+                values[(slot, path_id)] = unpack(new)
+                expected.setdefault((slot, path_id), unpack(old))
+        written, errors = self._write(load, values, expected)
+
+        applied = []
+        for operation in staged:
+            if not set(operation.slots) & set(errors):
+                operation.applied = True
+                applied.append(operation)
+        return applied, errors
+
+    def undo(self, load):
+        """
+        Take back the last operation in effect: a staged one has its old
+        values put back in memory, an applied one has them saved.
+        Returns (operation, {slot} written).
+        """
+        if not self.can_undo():
+            return None, set()
+        operation = self.operations[self.position - 1]
+        old_values = {(slot, path_id): unpack(old) for slot, path_id, old, _ in operation.deltas}
+        written = set()
+        if operation.applied:
+            self._check(load, operation, 3)
+            written, errors = self._write(load, old_values, {(slot, path_id): unpack(new)
+                                                             for slot, path_id, _, new in operation.deltas})
+            if errors:
+                raise OSError(f"undo failed for {', '.join(f'{slot:03}: {error}' for slot, error in errors.items())}")
+            self.position -= 1
+        else:
+            self.position -= 1
+            self._set(load, old_values)
+        return operation, written
+
+    def redo(self, load):
+        """
+        Put the next undone operation back in effect: staged again, or saved
+        again if it had been applied. Returns (operation, {slot} written).
+        """
+        if not self.can_redo():
+            return None, set()
+        operation = self.operations[self.position]
+        new_values = {(slot, path_id): unpack(new) for slot, path_id, _, new in operation.deltas}
+        written = set()
+        if operation.applied:
+            self._check(load, operation, 2)
+            written, errors = self._write(load, new_values, {(slot, path_id): unpack(old)
+                                                             for slot, path_id, old, _ in operation.deltas})
+            if errors:
+                raise OSError(f"redo failed for {', '.join(f'{slot:03}: {error}' for slot, error in errors.items())}")
+            self.position += 1
+        else:
+            self.position += 1
+            self._set(load, new_values)
+        return operation, written
+
+    def size(self):
+        """Approximate memory held by the journal in bytes"""
+        total = sys.getsizeof(self.operations) + sys.getsizeof(self.paths)
+        total += sum(sys.getsizeof(path) for path in self.paths)
+        for operation in self.operations:
+            total += sys.getsizeof(operation) + sys.getsizeof(operation.deltas)
+            total += sum(sys.getsizeof(delta) for delta in operation.deltas)
+        return total
+
+    def __len__(self):
+        return len(self.operations)
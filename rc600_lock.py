@@ -0,0 +1,220 @@
+"""
+RC-600 card locks
+Advisory locks that let the CLI, the TUI and scripts write one DATA
+folder at the same time. Each slot is one byte of the `.rc600.lock` file
+in the DATA folder, locked with fcntl.lockf, so processes working on
+disjoint slots run in parallel and a batch session can hold its slots for
+its whole run.
+
+POSIX locks belong to a process, so locks are counted per process: a
+save inside a batch session of the same process doesn't wait for it.
+Saves of the same slot from two threads are kept apart by slot_lock()
+and slot_locks().
+On filesystems without POSIX locks (and without fcntl) every slot gets
+an exclusively created lock file holding the owner's pid instead.
+"""
+
+import errno
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import rc600_stats as stats
+
+try:
+    import fcntl
+except ImportError:  # no POSIX locks: lock files only
+    fcntl = None
+
+LOCK_FILE = '.rc600.lock'
+TIMEOUT = 10.0
+POLL_INTERVAL = 0.02
+UNSUPPORTED_ERRORS = {errno.ENOLCK, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+_registry = threading.Lock()
+_files = {}  # DATA folder -> [fd of the lock file or None for lock files, slots held]
+_held = {}  # (DATA folder, slot) -> number of holders in this process
+_mutexes = {}  # (DATA folder, slot) -> threading.Lock for slot_lock()
+
+
+def lock_path(path):
+    return os.path.join(path, LOCK_FILE)
+
+
+def _try_fcntl(fd, slot):
+    try:
+        fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, slot)
+        return True
+    except OSError as e:
+        if e.errno in (errno.EACCES, errno.EAGAIN):
+            return False
+        raise
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _try_file(path, slot):
+    """Create the slot's lock file; a file left behind by a dead process is taken over"""
+    file = f'{lock_path(path)}.{slot:03}'
+    try:
+        fd = os.open(file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            with open(file) as f:
+                pid = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return False
+        if pid and not _pid_alive(pid):
+            try:
+                os.remove(file)
+            except OSError:
+                pass
+        return False
+    os.write(fd, str(os.getpid()).encode('ascii'))
+    os.close(fd)
+    return True
+
+
+def _open(path):
+    """Called with the registry held: [fd or None, slots held] for a DATA folder"""
+    entry = _files.get(path)
+    if entry is None:
+        fd = os.open(lock_path(path), os.O_CREAT | os.O_RDWR, 0o644) if fcntl is not None else None
+        entry = _files[path] = [fd, 0]
+    return entry
+
+
+def _try_lock(path, slot):
+    """Called with the registry held: lock a slot for this process if no other process holds it"""
+    entry = _open(path)
+    if entry[0] is not None:
+        try:
+            return _try_fcntl(entry[0], slot)
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_ERRORS or entry[1]:
+                raise
+            # No POSIX locks on this filesystem: switch the folder to lock files
+            os.close(entry[0])
+            entry[0] = None
+    return _try_file(path, slot)
+
+
+def _acquire(path, slot, deadline):
+    while True:
+        with _registry:
+            key = (path, slot)
+            if key in _held:
+                _held[key] += 1
+                return
+            if _try_lock(path, slot):
+                _held[key] = 1
+                _files[path][1] += 1
+                return
+            if not _files[path][1]:
+                _close(path)
+        if time.monotonic() >= deadline:
+            stats.count('lock.timeout')
+            raise TimeoutError(f"memory {slot:03} in {path} is locked by another process")
+        stats.count('lock.wait')
+        time.sleep(POLL_INTERVAL)
+
+
+def _release(path, slot):
+    with _registry:
+        key = (path, slot)
+        _held[key] -= 1
+        if _held[key]:
+            return
+        del _held[key]
+        entry = _files[path]
+        if entry[0] is not None:
+            fcntl.lockf(entry[0], fcntl.LOCK_UN, 1, slot)
+        else:
+            try:
+                os.remove(f'{lock_path(path)}.{slot:03}')
+            except OSError:
+                pass
+        entry[1] -= 1
+        if not entry[1]:
+            _close(path)
+
+
+def _close(path):
+    # Closing any descriptor of the file drops all of the process's locks on it,
+    # so it is only closed once no slot is held
+    fd = _files.pop(path)[0]
+    if fd is not None:
+        os.close(fd)
+
+
+class CardLock:
+    """
+    Lock slots of a DATA folder (all 100 by default) against other
+    processes; a context manager. Waits up to `timeout` seconds for slots
+    held elsewhere, then raises TimeoutError with nothing held.
+    """
+
+    def __init__(self, path=None, slots=range(100), timeout=TIMEOUT):
+        from rc600_patch_manager import Memory
+
+        self.path = os.path.realpath(path or Memory.cwd)
+        self.slots = sorted(set(slots))  # always in the same order, so sessions can't deadlock
+        self.timeout = timeout
+        self.acquired = []
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        try:
+            with stats.timer('lock.acquire'):
+                for slot in self.slots:
+                    _acquire(self.path, slot, deadline)
+                    self.acquired.append(slot)
+        except BaseException:
+            self.release()
+            raise
+        return self
+
+    def release(self):
+        while self.acquired:
+            _release(self.path, self.acquired.pop())
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+@contextmanager
+def slot_locks(path, slots, timeout=TIMEOUT):
+    """Hold slots against other processes and other threads of this one, e.g. around a batch of writes"""
+    path = os.path.realpath(path)
+    slots = sorted(set(slots))  # the same order as CardLock, so threads can't deadlock either
+    deadline = time.monotonic() + timeout
+    with _registry:
+        mutexes = [_mutexes.setdefault((path, slot), threading.Lock()) for slot in slots]
+    held = []
+    try:
+        for slot, mutex in zip(slots, mutexes):
+            if not mutex.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                raise TimeoutError(f"memory {slot:03} in {path} is being saved by another thread")
+            held.append(mutex)
+        with CardLock(path, slots, max(deadline - time.monotonic(), 0)):
+            yield
+    finally:
+        for mutex in reversed(held):
+            mutex.release()
+
+
+def slot_lock(path, slot, timeout=TIMEOUT):
+    """Hold one slot against other processes and other threads of this one, e.g. around a save"""
+    return slot_locks(path, [slot], timeout)
@@ -0,0 +1,279 @@
+"""
+RC-600 loop loudness
+Streams each track WAV through NumPy in fixed-size chunks of a memory
+map, measuring RMS, peak and an approximate integrated loudness (BS.1770
+gating over 400 ms blocks, without the K-weighting filter). From those it
+suggests track play levels, per track or per patch, and can write them
+to the card.
+
+Play levels are taken as linear amplitude with 100 as unity gain (0 dB),
+up to 200 (+6 dB).
+"""
+
+import argparse
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import rc600_stats as stats
+from rc600_audio import (TRACKS, WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM, WaveIndex, read_header,
+                         track_file)
+from rc600_patch_manager import DATA_HELP, StaleBankError, default_data_path, parse_slots
+from rc600_plan import Plan
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only required for the analysis itself
+    np = None
+
+TARGET_LUFS = -18.0
+LEVEL_UNITY = 100
+LEVEL_MAX = 200
+
+BLOCKS_PER_SECOND = 10  # 100 ms sub-blocks, four to a 400 ms gating block
+CHUNK_BLOCKS = 50  # sub-blocks per chunk read from the file (5 s of audio)
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is not installed (pip install numpy)")
+    return np
+
+
+def to_db(power):
+    """Mean square -> dB, None for silence"""
+    return 10 * math.log10(power) if power > 0 else None
+
+
+def decode(raw, header):
+    """Raw bytes of whole frames -> float32 samples in [-1, 1], shape (frames, channels)"""
+    audio_format, bits = header['format'], header['bits']
+    if audio_format == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        samples = raw.view('<f4' if bits == 32 else '<f8').astype(np.float32, copy=False)
+    elif audio_format == WAVE_FORMAT_PCM and bits == 8:
+        samples = (raw.astype(np.float32) - 128) / 128
+    elif audio_format == WAVE_FORMAT_PCM and bits in (16, 32):
+        samples = raw.view('<i2' if bits == 16 else '<i4').astype(np.float32) / 2 ** (bits - 1)
+    elif audio_format == WAVE_FORMAT_PCM and bits == 24:
+        triples = raw.reshape(-1, 3).astype(np.int32)
+        samples = triples[:, 0] | (triples[:, 1] << 8) | (triples[:, 2] << 16)
+        samples = (np.where(samples >= 2**23, samples - 2**24, samples)).astype(np.float32) / 2**23
+    else:
+        raise ValueError(f"unsupported sample format {audio_format} ({bits}-bit)")
+    return samples.reshape(-1, header['channels'])
+
+
+def integrated_loudness(powers):
+    """Gated loudness of 100 ms sub-block powers (channel powers summed), or None if silent"""
+    if not len(powers):
+        return None
+    powers = np.asarray(powers)
+    # 400 ms blocks overlapping by 75%
+    blocks = np.convolve(powers, np.ones(4) / 4, 'valid') if len(powers) >= 4 else powers.mean(keepdims=True)
+    with np.errstate(divide='ignore'):
+        loudness = -0.691 + 10 * np.log10(blocks)
+    gated = blocks[loudness > ABSOLUTE_GATE]
+    if not len(gated):
+        return None
+    threshold = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE
+    gated = blocks[(loudness > ABSOLUTE_GATE) & (loudness > threshold)]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+def analyze_file(file, header=None):
+    """
+    Measure a WAV file, reading at most CHUNK_BLOCKS sub-blocks at a time.
+    Returns 'rms' and 'peak' (dBFS) and 'lufs' (approximate), each None
+    for digital silence, plus 'duration'.
+    """
+    require_numpy()
+    header = header or read_header(file)
+    block_align = header['block_align']
+    block_frames = max(1, header['sample_rate'] // BLOCKS_PER_SECOND)
+    chunk_size = block_frames * CHUNK_BLOCKS * block_align
+    data_size = header['frames'] * block_align
+
+    powers = []
+    square_sum = 0.0
+    peak = 0.0
+    with stats.timer('audio.analyze'):
+        if data_size:
+            data = np.memmap(file, dtype=np.uint8, mode='r', offset=header['data_offset'], shape=(data_size,))
+            for start in range(0, data_size, chunk_size):
+                samples = decode(data[start:start + chunk_size], header)
+                squares = np.square(samples, dtype=np.float64)
+                square_sum += squares.sum()
+                peak = max(peak, float(np.abs(samples).max()))
+                # Channel powers are summed per sub-block, as BS.1770 does for L/R
+                full = len(squares) // block_frames * block_frames
+                powers.extend(squares[:full].reshape(-1, block_frames, squares.shape[1]).mean(axis=1).sum(axis=1))
+                if full < len(squares):
+                    powers.append(squares[full:].mean(axis=0).sum())
+            del data
+
+    samples = header['frames'] * header['channels']
+    return {
+        'rms': to_db(square_sum / samples) if samples else None,
+        'peak': 20 * math.log10(peak) if peak > 0 else None,
+        'lufs': integrated_loudness(powers),
+        'duration': header['duration'],
+    }
+
+
+def analyze_card(path=None, slots=range(100), wave_path=None, workers=4):
+    """
+    Analyze every track recording of the given slots on `workers` threads
+    (NumPy releases the GIL while crunching, and each worker only holds
+    one chunk). Returns {(slot, track): analysis or {'error'}}.
+    """
+    index = WaveIndex(path, wave_path)
+    index.load()
+    index.scan(slots)
+    index.save()
+    slots = set(slots)
+    entries = {key: entry for key, entry in index.entries.items() if key[0] in slots}
+
+    def run(item):
+        key, entry = item
+        if 'error' in entry:
+            return key, {'error': entry['error']}
+        try:
+            return key, analyze_file(track_file(index.path, *key), entry)
+        except (OSError, ValueError) as e:
+            return key, {'error': str(e)}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(executor.map(run, sorted(entries.items())))
+
+
+def level_gain(level):
+    """Play level -> gain in dB (None for level 0)"""
+    return 20 * math.log10(level / LEVEL_UNITY) if level > 0 else None
+
+
+def gain_level(gain):
+    """Gain in dB -> nearest play level"""
+    return max(0, min(LEVEL_MAX, round(LEVEL_UNITY * 10 ** (gain / 20))))
+
+
+def suggest_track_level(analysis, target=TARGET_LUFS, ceiling=0.0):
+    """Play level that brings a track to `target` LUFS without its peaks passing `ceiling` dBFS"""
+    if analysis.get('lufs') is None:
+        return None
+    gain = target - analysis['lufs']
+    if analysis['peak'] is not None:
+        gain = min(gain, ceiling - analysis['peak'])
+    return gain_level(gain)
+
+
+def suggest_patch_levels(analyses, levels, target=TARGET_LUFS, ceiling=0.0):
+    """
+    Play levels for the six tracks of a patch that move the whole mix to
+    `target` LUFS while keeping the balance between its tracks. `analyses`
+    and `levels` are per track (None for tracks without audio); tracks
+    without audio keep their level.
+    """
+    playing = [(analysis, level_gain(level)) for analysis, level in zip(analyses, levels)
+               if analysis and analysis.get('lufs') is not None and level > 0]
+    if not playing:
+        return list(levels)
+
+    # Tracks are summed as uncorrelated signals
+    mix = 10 * math.log10(sum(10 ** ((analysis['lufs'] + gain) / 10) for analysis, gain in playing))
+    offset = target - mix
+    for analysis, gain in playing:
+        if analysis['peak'] is not None:
+            offset = min(offset, ceiling - analysis['peak'] - gain)
+
+    return [gain_level(level_gain(level) + offset) if analysis and analysis.get('lufs') is not None and level > 0
+            else level for analysis, level in zip(analyses, levels)]
+
+
+def plan_levels(path, analyses, slots, mode='track', target=TARGET_LUFS, ceiling=0.0):
+    """
+    Plan play level changes from card analyses. Returns the Plan and
+    {slot: [(old, new) per track]}; slots without audio are left out.
+    """
+    from rc600_patch_manager import Memory
+
+    plan = Plan(path)
+    changes = {}
+    for slot in slots:
+        track_analyses = [analyses.get((slot, track)) for track in TRACKS]
+        track_analyses = [analysis if analysis and 'error' not in analysis else None for analysis in track_analyses]
+        if not any(track_analyses):
+            continue
+
+        m = Memory(slot, plan.path)
+        tracks = m.tracks
+        levels = [track.play_level for track in tracks]
+        if mode == 'patch':
+            suggested = suggest_patch_levels(track_analyses, levels, target, ceiling)
+        else:
+            suggested = [suggest_track_level(analysis, target, ceiling) if analysis else None
+                         for analysis in track_analyses]
+            suggested = [level if new is None else new for level, new in zip(levels, suggested)]
+
+        for track, level in zip(tracks, suggested):
+            track.play_level = level
+        changes[slot] = list(zip(levels, suggested))
+        plan.add_memory(m, "play levels " + ' '.join(map(str, suggested)))
+    return plan, changes
+
+
+def format_db(value):
+    return f'{value:6.1f}' if value is not None else '     -'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure loop loudness and suggest track play levels")
+    parser.add_argument('--data', help=DATA_HELP)
+    parser.add_argument('--wave', help="WAVE folder (default: next to the DATA folder)")
+    parser.add_argument('--slots', type=parse_slots, default=range(100), help="slot range, e.g. 0-99")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--target', type=float, default=TARGET_LUFS, help="target loudness in LUFS")
+    parser.add_argument('--ceiling', type=float, default=0.0, help="highest allowed peak in dBFS")
+    parser.add_argument('--mode', choices=('track', 'patch'), default='track',
+                        help="level each track on its own, or each patch's mix keeping its balance")
+    parser.add_argument('--apply', action='store_true', help="write the suggested play levels")
+    args = parser.parse_args(argv)
+
+    data_path = args.data or default_data_path()
+    try:
+        require_numpy()
+    except RuntimeError as e:
+        print(e)
+        return 1
+
+    start = time.perf_counter()
+    analyses = analyze_card(data_path, args.slots, args.wave, args.workers)
+    elapsed = time.perf_counter() - start
+    plan, changes = plan_levels(data_path, analyses, args.slots, args.mode, args.target, args.ceiling)
+
+    print("slot track    rms   peak   lufs  level")
+    for (slot, track), analysis in analyses.items():
+        if 'error' in analysis:
+            print(f"{slot:03}  {track}     {analysis['error']}")
+            continue
+        old, new = changes.get(slot, [(None, None)] * 6)[track - 1]
+        level = f"{old} -> {new}" if old != new else str(old)
+        print(f"{slot:03}  {track}   {format_db(analysis['rms'])} {format_db(analysis['peak'])} "
+              f"{format_db(analysis['lufs'])}  {level}")
+    print(f"Analyzed {len(analyses)} tracks in {elapsed:.2f}s")
+
+    print(plan)
+    if args.apply:
+        try:
+            plan.execute()
+        except StaleBankError as e:
+            print(e)
+            return 1
+        print(f"{len(plan.writes)} patches written")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+"""
+RC-600 MIDI tools
+Low-latency MIDI monitor with filtering and ring-buffer capture,
+MIDI clock tempo/jitter analytics and Program Change slot following
+"""
+
+import argparse
+import queue
+import random
+import sys
+import time
+import threading
+from collections import deque
+
+try:
+    import mido
+except ImportError:  # mido is only required to talk to real ports
+    mido = None
+
+
+def require_mido():
+    if mido is None:
+        raise RuntimeError("mido is not installed (pip install mido python-rtmidi)")
+    return mido
+
+
+def find_rc600_port(names=None):
+    """Return the first MIDI input port whose name contains 'RC-600'"""
+    if names is None:
+        names = require_mido().get_input_names()
+    return next((name for name in names if "RC-600" in name), None)
+
+
+def open_rc600_input(name=None):
+    """Open a MIDI input port, the RC-600 unless another name is given"""
+    midi = require_mido()
+    name = name or find_rc600_port()
+    if not name:
+        raise RuntimeError("RC-600 not found. Is it connected via USB?")
+    return midi.open_input(name)
+
+
+def format_message(timestamp, msg):
+    """Format a captured message as a single display line"""
+    return f"{timestamp:10.3f}  {msg}"
+
+
+CLOCK_PPQN = 24  # MIDI clock ticks per quarter note
+CLOCK_DIVISIONS = (1, 6, CLOCK_PPQN)  # every tick, one per 16th, one per beat
+
+
+class MidiFilter:
+    """
+    Decides which incoming messages are kept by the monitor. Shown clock
+    is decimated to one tick of every `clock_every` (24: one per beat),
+    counted from the last Start.
+    """
+
+    def __init__(self, cc=True, pc=True, sysex=True, notes=True, other=True, clock=False, clock_every=1):
+        self.cc = cc
+        self.pc = pc
+        self.sysex = sysex
+        self.notes = notes
+        self.other = other
+        self.clock = clock
+        self.clock_every = clock_every
+        self._clock_phase = 0
+
+    def accepts(self, msg):
+        kind = msg.type
+        if kind == 'clock':
+            phase = self._clock_phase
+            self._clock_phase = (phase + 1) % self.clock_every
+            return self.clock and phase == 0
+        if kind == 'start':
+            self._clock_phase = 0
+        if kind == 'control_change':
+            return self.cc
+        if kind == 'program_change':
+            return self.pc
+        if kind == 'sysex':
+            return self.sysex
+        if kind in ('note_on', 'note_off'):
+            return self.notes
+        return self.other
+
+    def toggle(self, kind):
+        """Flip one of the filter flags ('cc', 'pc', 'sysex', 'notes', 'other', 'clock')"""
+        setattr(self, kind, not getattr(self, kind))
+        return getattr(self, kind)
+
+    def cycle_clock_every(self):
+        """Step the clock decimation through CLOCK_DIVISIONS; returns the new value"""
+        following = [every for every in CLOCK_DIVISIONS if every > self.clock_every]
+        self.clock_every = following[0] if following else CLOCK_DIVISIONS[0]
+        self._clock_phase = 0
+        return self.clock_every
+
+    def __str__(self):
+        flags = ('cc', 'pc', 'sysex', 'notes', 'other', 'clock')
+        text = ' '.join(f"{flag.upper()}:{'on' if getattr(self, flag) else 'off'}" for flag in flags)
+        return text + (f" (1/{self.clock_every})" if self.clock and self.clock_every > 1 else '')
+
+
+class RingBuffer:
+    """Fixed-size buffer of (timestamp, message) pairs, oldest entries dropped first"""
+
+    def __init__(self, size=4096):
+        self.size = size
+        self.items = deque(maxlen=size)
+        self.dropped = 0
+
+    def append(self, item):
+        if len(self.items) == self.size:
+            self.dropped += 1
+        self.items.append(item)
+
+    def drain(self, limit=None):
+        """Remove and return buffered items, oldest first"""
+        batch = []
+        items = self.items
+        while items and (limit is None or len(batch) < limit):
+            batch.append(items.popleft())
+        return batch
+
+    def snapshot(self):
+        """Return buffered items without consuming them"""
+        return list(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class MidiMonitor:
+    """
+    Captures MIDI input into a ring buffer without doing any I/O on the
+    receiving path. Consumers call drain() at their own refresh rate and
+    render the whole batch at once.
+    """
+
+    def __init__(self, port=None, size=4096, midi_filter=None):
+        self.port = port
+        self.buffer = RingBuffer(size)
+        self.filter = midi_filter or MidiFilter()
+        self.started = time.perf_counter()
+        self.received = 0
+        self.filtered = 0
+        self.clock_ticks = 0
+        self._rate_mark = (self.started, 0, 0)
+        self._rates = (0.0, 0.0)
+
+    def open(self, name=None, callback=True):
+        """
+        Open a MIDI input port (the RC-600 by default). With callback=False
+        the port is left in polling mode and poll() must be called regularly.
+        """
+        if self.port is None:
+            self.port = open_rc600_input(name)
+        if callback:
+            self.port.callback = self.on_message
+        return self
+
+    def close(self):
+        if self.port is not None:
+            self.port.callback = None
+            self.port.close()
+
+    def __enter__(self):
+        return self.open() if self.port is None else self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def poll(self):
+        """Non-blocking read of everything pending on the port"""
+        count = 0
+        for msg in self.port.iter_pending():
+            self.on_message(msg)
+            count += 1
+        return count
+
+    def on_message(self, msg):
+        """Receive callback; keep this cheap, it runs on the MIDI thread"""
+        now = time.perf_counter()
+        self.received += 1
+        if msg.type == 'clock':
+            self.clock_ticks += 1
+        if not self.filter.accepts(msg):
+            self.filtered += 1
+            return
+        self.buffer.append((now - self.started, msg))
+
+    def drain(self, limit=None):
+        return self.buffer.drain(limit)
+
+    def format_batch(self, batch):
+        return '\n'.join(format_message(timestamp, msg) for timestamp, msg in batch)
+
+    def rates(self):
+        """Return (messages/s, clock ticks/s) measured since the previous call"""
+        now = time.perf_counter()
+        last_time, last_received, last_ticks = self._rate_mark
+        elapsed = now - last_time
+        if elapsed >= 0.25:
+            self._rates = (
+                (self.received - last_received) / elapsed,
+                (self.clock_ticks - last_ticks) / elapsed,
+            )
+            self._rate_mark = (now, self.received, self.clock_ticks)
+        return self._rates
+
+    def stats(self):
+        msg_rate, clock_rate = self.rates()
+        return {
+            'received': self.received,
+            'filtered': self.filtered,
+            'buffered': len(self.buffer),
+            'dropped': self.buffer.dropped,
+            'msg_rate': msg_rate,
+            'clock_rate': clock_rate,
+        }
+
+
+class MockPort:
+    """
+    Stand-in for a mido input port, used to exercise the monitor without
+    the pedal attached. Messages sent to it are delivered to the callback
+    if one is set, otherwise queued for iter_pending().
+    """
+
+    def __init__(self, name="Mock RC-600"):
+        self.name = name
+        self.callback = None
+        self.closed = False
+        self._pending = deque()
+
+    def send(self, msg):
+        callback = self.callback
+        if callback is not None:
+            callback(msg)
+        else:
+            self._pending.append(msg)
+
+    def iter_pending(self):
+        pending = self._pending
+        while pending:
+            yield pending.popleft()
+
+    def close(self):
+        self.closed = True
+
+
+def sample_messages():
+    """A mix of messages typical of the RC-600 (clock, CC, PC, SysEx)"""
+    midi = require_mido()
+    return (
+        [midi.Message('clock')] * 6
+        + [
+            midi.Message('control_change', channel=0, control=80, value=127),
+            midi.Message('program_change', channel=0, program=4),
+            midi.Message('sysex', data=(0x41, 0x10, 0x00, 0x00)),
+            midi.Message('note_on', channel=0, note=60, velocity=100),
+        ]
+    )
+
+
+class ProgramChangeListener:
+    """
+    Calls on_slot(slot) for every Program Change received. Bank select
+    (CC#0) is honoured so memories above 128 can be reached; program 0
+    of bank 0 maps to slot `offset`.
+    """
+
+    def __init__(self, on_slot, port=None, channel=None, offset=1):
+        self.on_slot = on_slot
+        self.port = port
+        self.channel = channel
+        self.offset = offset
+        self.bank = 0
+
+    def open(self, name=None):
+        if self.port is None:
+            self.port = open_rc600_input(name)
+        self.port.callback = self.on_message
+        return self
+
+    def close(self):
+        if self.port is not None:
+            self.port.callback = None
+            self.port.close()
+
+    def on_message(self, msg):
+        if self.channel is not None and getattr(msg, 'channel', None) != self.channel:
+            return
+        if msg.type == 'control_change' and msg.control == 0:
+            self.bank = msg.value
+        elif msg.type == 'program_change':
+            self.on_slot(self.bank * 128 + msg.program + self.offset)
+
+
+CLOCKS_PER_BEAT = 24
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_values:
+        return 0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class ClockAnalyzer:
+    """
+    Rolling tempo, jitter and dropout statistics for MIDI clock.
+    Only the last `window` tick intervals are kept, so memory is constant
+    no matter how long the show runs.
+
+    A gap longer than `dropout_factor` times the mean interval is a dropout
+    when it is close to a whole number of intervals. A gap that isn't, or
+    `tempo_change_run` such gaps in a row, is a tempo change instead: the
+    window restarts from the new intervals.
+    """
+
+    def __init__(self, window=96, reference_bpm=None, dropout_factor=1.9, multiple_tolerance=0.2,
+                 tempo_change_run=3):
+        self.window = window
+        self.reference_bpm = reference_bpm
+        self.dropout_factor = dropout_factor
+        self.multiple_tolerance = multiple_tolerance
+        self.tempo_change_run = tempo_change_run
+        self.intervals = deque(maxlen=window)
+        self.gaps = []  # consecutive over-threshold intervals as (interval, missed ticks)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.intervals.clear()
+            self.gaps.clear()
+            self._sum = 0
+            self.last_tick = None
+            self.ticks = 0
+            self.dropouts = 0
+            self.missed_ticks = 0
+            self.running = False
+
+    def start(self, t_ns=None):
+        """
+        Transport start/continue: the gap before the next tick is not a
+        dropout, and the tempo is measured afresh (it may have changed
+        while stopped)
+        """
+        with self.lock:
+            self.intervals.clear()
+            self.gaps.clear()
+            self._sum = 0
+            self.last_tick = None
+            self.running = True
+
+    def stop(self, t_ns=None):
+        with self.lock:
+            self.last_tick = None
+            self.running = False
+
+    def tick(self, t_ns=None):
+        """Record one clock tick, timestamped with perf_counter_ns()"""
+        if t_ns is None:
+            t_ns = time.perf_counter_ns()
+        with self.lock:
+            self.ticks += 1
+            last, self.last_tick = self.last_tick, t_ns
+            if last is None:
+                return
+            interval = t_ns - last
+            intervals = self.intervals
+            if intervals:
+                mean = self._sum / len(intervals)
+                if interval > mean * self.dropout_factor:
+                    ratio = interval / mean
+                    if abs(ratio - round(ratio)) <= self.multiple_tolerance:
+                        # Keep the gap out of the window so it doesn't skew the tempo
+                        missed = max(1, int(round(ratio)) - 1)
+                        self.gaps.append((interval, missed))
+                        self.dropouts += 1
+                        self.missed_ticks += missed
+                        if len(self.gaps) < self.tempo_change_run:
+                            return
+                    else:
+                        self.gaps.append((interval, 0))
+                    self._change_tempo()
+                    return
+                self.gaps.clear()
+            if len(intervals) == self.window:
+                self._sum -= intervals[0]
+            intervals.append(interval)
+            self._sum += interval
+
+    def _change_tempo(self):
+        # Called with the lock held: the gaps were the new tempo, not dropouts
+        for _, missed in self.gaps:
+            if missed:
+                self.dropouts -= 1
+                self.missed_ticks -= missed
+        self.intervals.clear()
+        self.intervals.extend(interval for interval, _ in self.gaps)
+        self._sum = sum(self.intervals)
+        self.gaps.clear()
+
+    def handle(self, kind, t_ns):
+        """Dispatch a realtime message type ('clock', 'start', 'continue', 'stop')"""
+        if kind == 'clock':
+            self.tick(t_ns)
+        elif kind in ('start', 'continue'):
+            self.start(t_ns)
+        elif kind == 'stop':
+            self.stop(t_ns)
+
+    @property
+    def bpm(self):
+        with self.lock:
+            if not self.intervals:
+                return None
+            mean = self._sum / len(self.intervals)
+        return 60e9 / (mean * CLOCKS_PER_BEAT)
+
+    def snapshot(self):
+        """Current statistics; jitter is the deviation from the mean interval in microseconds"""
+        with self.lock:
+            intervals = list(self.intervals)
+            total = self._sum
+            ticks, dropouts, missed = self.ticks, self.dropouts, self.missed_ticks
+
+        result = {
+            'bpm': None,
+            'reference_bpm': self.reference_bpm,
+            'drift': None,
+            'drift_pct': None,
+            'jitter_p50': 0.0,
+            'jitter_p95': 0.0,
+            'jitter_p99': 0.0,
+            'jitter_max': 0.0,
+            'ticks': ticks,
+            'dropouts': dropouts,
+            'missed_ticks': missed,
+            'window': len(intervals),
+        }
+        if not intervals:
+            return result
+
+        mean = total / len(intervals)
+        bpm = 60e9 / (mean * CLOCKS_PER_BEAT)
+        deviations = sorted(abs(interval - mean) / 1000.0 for interval in intervals)
+        result.update({
+            'bpm': bpm,
+            'jitter_p50': percentile(deviations, 50),
+            'jitter_p95': percentile(deviations, 95),
+            'jitter_p99': percentile(deviations, 99),
+            'jitter_max': deviations[-1],
+        })
+        if self.reference_bpm:
+            result['drift'] = bpm - self.reference_bpm
+            result['drift_pct'] = (bpm - self.reference_bpm) / self.reference_bpm * 100.0
+        return result
+
+
+def format_clock_stats(stats):
+    """One-line summary of ClockAnalyzer.snapshot()"""
+    if stats['bpm'] is None:
+        return f"Waiting for clock... (ticks: {stats['ticks']})"
+    line = f"BPM {stats['bpm']:6.2f}"
+    if stats['reference_bpm']:
+        line += f" (patch {stats['reference_bpm']:.1f}, drift {stats['drift']:+.2f} / {stats['drift_pct']:+.2f}%)"
+    line += (
+        f" | jitter p50 {stats['jitter_p50']:.0f}us p95 {stats['jitter_p95']:.0f}us"
+        f" p99 {stats['jitter_p99']:.0f}us max {stats['jitter_max']:.0f}us"
+        f" | dropouts {stats['dropouts']} ({stats['missed_ticks']} ticks)"
+    )
+    return line
+
+
+class ClockMonitor(threading.Thread):
+    """
+    Feeds a ClockAnalyzer from a MIDI port on a dedicated thread.
+    The port callback only timestamps realtime messages and queues them;
+    all analysis happens on this thread, away from the UI.
+    """
+
+    REALTIME = ('clock', 'start', 'continue', 'stop')
+
+    def __init__(self, port=None, analyzer=None):
+        super().__init__(name="rc600-clock", daemon=True)
+        self.port = port
+        self.analyzer = analyzer or ClockAnalyzer()
+        self.events = queue.SimpleQueue()
+        self._stopped = threading.Event()
+
+    def open(self, name=None):
+        if self.port is None:
+            self.port = open_rc600_input(name)
+        self.port.callback = self.on_message
+        self.start()
+        return self
+
+    def on_message(self, msg):
+        if msg.type in self.REALTIME:
+            self.events.put((time.perf_counter_ns(), msg.type))
+
+    def run(self):
+        events, analyzer = self.events, self.analyzer
+        while not self._stopped.is_set():
+            try:
+                t_ns, kind = events.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            analyzer.handle(kind, t_ns)
+
+    def close(self):
+        self._stopped.set()
+        if self.port is not None:
+            self.port.callback = None
+            self.port.close()
+        if self.is_alive():
+            self.join(timeout=1)
+
+
+class SyntheticClock(threading.Thread):
+    """
+    Sends MIDI clock to a port at a given tempo, with optional timing
+    jitter (standard deviation in ms) and random dropped ticks.
+    """
+
+    def __init__(self, port, bpm=120.0, jitter_ms=0.0, drop_rate=0.0, seed=None):
+        super().__init__(name="rc600-synthetic-clock", daemon=True)
+        self.port = port
+        self.bpm = bpm
+        self.jitter_ms = jitter_ms
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.sent = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        midi = require_mido()
+        clock = midi.Message('clock')
+        self.port.send(midi.Message('start'))
+        period = 60.0 / (self.bpm * CLOCKS_PER_BEAT)
+        next_tick = time.perf_counter()
+        while not self._stopped.is_set():
+            next_tick += period
+            due = next_tick
+            if self.jitter_ms:
+                due += self.random.gauss(0, self.jitter_ms / 1000.0)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if self.drop_rate and self.random.random() < self.drop_rate:
+                continue
+            self.port.send(clock)
+            self.sent += 1
+        self.port.send(midi.Message('stop'))
+
+    def stop(self):
+        self._stopped.set()
+        if self.is_alive():
+            self.join(timeout=1)
+
+
+def run_clock_monitor(port_name=None, reference_bpm=None, interval=1.0, synthetic_bpm=None, out=None):
+    """Print clock statistics once per interval until Ctrl+C"""
+    out = out or sys.stdout
+    generator = None
+    port = None
+    if synthetic_bpm:
+        port = MockPort("Synthetic clock")
+        generator = SyntheticClock(port, synthetic_bpm, jitter_ms=0.3)
+
+    monitor = ClockMonitor(port, ClockAnalyzer(reference_bpm=reference_bpm)).open(port_name)
+    if generator:
+        generator.start()
+    out.write(f"Clock from: {monitor.port.name}\nPress Ctrl+C to stop.\n\n")
+    try:
+        while True:
+            time.sleep(interval)
+            out.write(format_clock_stats(monitor.analyzer.snapshot()) + '\n')
+            out.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if generator:
+            generator.stop()
+        monitor.close()
+    return monitor.analyzer.snapshot()
+
+
+def run_monitor(port_name=None, interval=0.05, midi_filter=None, out=None):
+    """Print incoming messages to the terminal in batches until Ctrl+C"""
+    out = out or sys.stdout
+    monitor = MidiMonitor(midi_filter=midi_filter).open(port_name)
+    out.write(f"Listening to: {monitor.port.name}\nPress Ctrl+C to stop.\n\n")
+    try:
+        while True:
+            time.sleep(interval)
+            batch = monitor.drain()
+            if batch:
+                out.write(monitor.format_batch(batch) + '\n')
+                out.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.close()
+    return monitor.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RC-600 MIDI tools")
+    parser.add_argument('mode', nargs='?', choices=('monitor', 'clock'), default='monitor')
+    parser.add_argument('--port', help="MIDI input port name (default: first RC-600 port)")
+    parser.add_argument('--clock', action='store_true', help="monitor: show clock messages")
+    parser.add_argument('--clock-every', type=int, default=1, metavar='N',
+                        help=f"monitor: show 1 of every N clock ticks ({CLOCK_PPQN}: one per beat); implies --clock")
+    parser.add_argument('--no-sysex', action='store_true', help="monitor: hide SysEx messages")
+    parser.add_argument('--bpm', type=float, help="clock: reference BPM to compare against")
+    parser.add_argument('--synthetic', type=float, metavar='BPM', help="clock: analyze a synthetic clock instead of a port")
+    args = parser.parse_args(argv)
+
+    if args.mode == 'clock':
+        run_clock_monitor(args.port, args.bpm, synthetic_bpm=args.synthetic)
+        return
+
+    if args.clock_every < 1:
+        parser.error("--clock-every must be at least 1")
+    midi_filter = MidiFilter(sysex=not args.no_sysex, clock=args.clock or args.clock_every > 1,
+                             clock_every=args.clock_every)
+    stats = run_monitor(args.port, midi_filter=midi_filter)
+    print(f"\n{stats['received']} received, {stats['filtered']} filtered, {stats['dropped']} dropped")
+
+
+if __name__ == '__main__':
+    main()
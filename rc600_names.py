@@ -0,0 +1,135 @@
+"""
+RC-600 patch names
+Codec for the NAME block (one <A>..<L> element per character, holding the
+character code), with validation against the RC-600's character set and
+length, and bulk operations that read or rewrite only the NAME region of
+each bank file.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import rc600_stats as stats
+from rc600_lock import CardLock
+from rc600_patch_manager import get_latest
+from rc600_plan import Plan
+
+NAME_LENGTH = 12
+NAME_CHARS = frozenset(chr(code) for code in range(32, 127))  # printable ASCII, as on the RC-600 display
+
+NAME_BLOCK = re.compile(rb'<NAME>.*?</NAME>', re.S)
+NAME_CHAR = re.compile(rb'<([A-Z])>(\d+)</\1>')
+
+# The NAME block sits right after <mem>; this much of a file always covers it
+NAME_REGION = 1024
+
+
+def validate_name(name, length=NAME_LENGTH):
+    """Return an error message for a name that doesn't fit the NAME block, or None"""
+    if name is None:
+        return "missing name"
+    if len(name.rstrip()) > length:
+        return f"name '{name}' is longer than {length} characters"
+    bad = sorted(set(name) - NAME_CHARS)
+    if bad:
+        return f"name '{name}' has unsupported characters: {' '.join(repr(char) for char in bad)}"
+    return None
+
+
+def decode(codes):
+    """Character codes -> name (trailing padding removed)"""
+    return bytes(int(code) for code in codes).decode('latin-1').strip()
+
+
+def encode(name, length=NAME_LENGTH):
+    """Name -> `length` character codes, padded with spaces; raises ValueError for invalid names"""
+    error = validate_name(name, length)
+    if error:
+        raise ValueError(error)
+    return list(f'{name:<{length}}'[:length].encode('ascii'))
+
+
+def decode_block(block):
+    """Decode the bytes of a NAME block"""
+    return decode(code for _, code in NAME_CHAR.findall(block))
+
+
+def find_block(content):
+    match = NAME_BLOCK.search(content)
+    if not match:
+        raise ValueError("NAME block not found")
+    return match
+
+
+def set_name(content, name):
+    """Return the bytes of a bank file with a new name; only the NAME block changes"""
+    match = find_block(content)
+    block = match.group(0)
+    codes = iter(encode(name, len(NAME_CHAR.findall(block))))
+    block = NAME_CHAR.sub(lambda m: b'<%s>%d</%s>' % (m.group(1), next(codes), m.group(1)), block)
+    return content[:match.start()] + block + content[match.end():]
+
+
+def read_name(path, slot):
+    """Decode a slot's name from the start of its active bank, without reading the whole file"""
+    bank, _ = get_latest(path, slot)
+    with stats.timer('names.read'):
+        with open(os.path.join(path, f'MEMORY{slot:03}{bank}.RC0'), 'rb') as f:
+            content = f.read(NAME_REGION)
+            if b'</NAME>' not in content:
+                content += f.read()
+    return decode_block(find_block(content).group(0))
+
+
+def read_names(path, slots=range(100), workers=8):
+    """Return {slot: name} for every readable slot"""
+    def read(slot):
+        try:
+            return slot, read_name(path, slot)
+        except (OSError, ValueError):
+            return slot, None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return {slot: name for slot, name in executor.map(read, slots) if name is not None}
+
+
+def rename(path, slot, name, dry_run=False):
+    """
+    Rename one slot: the active bank is copied to the next bank with only
+    the NAME block and count changed. Returns the plan entry (content None
+    when the slot already has that name). The slot stays locked from the
+    read to the write.
+    """
+    plan = Plan(path)
+    with CardLock(plan.path, [slot] if not dry_run else ()):
+        plan.add(slot, set_name(plan.read(slot), name), f"name '{name}'")
+        if not dry_run:
+            plan.execute()
+    return plan.entries[slot]
+
+
+def rename_many(path, names, workers=8, dry_run=False):
+    """
+    Rename {slot: name} in parallel. Every name is validated before any
+    file is written. Returns ({slot: plan entry}, {slot: error message}).
+    """
+    errors = {slot: error for slot, error in ((slot, validate_name(name)) for slot, name in names.items()) if error}
+    if errors:
+        return {}, errors
+
+    def run(item):
+        slot, name = item
+        try:
+            return slot, rename(path, slot, name, dry_run), None
+        except (OSError, ValueError) as e:
+            return slot, None, str(e)
+
+    entries = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for slot, entry, error in executor.map(run, names.items()):
+            if error:
+                errors[slot] = error
+            else:
+                entries[slot] = entry
+    return entries, errors
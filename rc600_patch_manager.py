@@ -1,11 +1,21 @@
-import csv
+import argparse
+import logging
 import os
-from io import BytesIO
 import sys
+from io import BytesIO
 import xml.etree.ElementTree as ET
 import re
 import copy
 
+import rc600_stats as stats
+from rc600_lock import CardLock, slot_lock
+
+log = logging.getLogger('rc600')
+
+DEFAULT_DATA_PATHS = ('/Volumes/RC-600/ROLAND/DATA', './DATA')
+DATA_HELP = "DATA folder (default: $RC600_DATA, /Volumes/RC-600/ROLAND/DATA or ./DATA)"
+COUNT_MODULO = 0x10000  # counts are written as four hex digits: FFFF is followed by 0000
+
 
 def read_last_line(filename):
     with open(filename, 'rb') as f:
@@ -15,23 +25,69 @@ def read_last_line(filename):
         return f.readline().decode()
 
 
-def get_latest(path, memslot):
-    letters = 'AB'
-    counts = []
-    for mem_sec in letters:
-        xml_path = f'{path}/MEMORY{memslot:03}{mem_sec}.RC0'
+def read_count(xml_path):
+    """Return the save counter of a bank file, or None if the file is missing or has no valid count line"""
+    try:
         line = read_last_line(xml_path)
-        if line.strip():
-            t = re.search(r"^<count>(\w+)</count>", line)
-            if not t:
-                continue
-            count = t.group(1)
-            count = int(count, 16)
-            counts.append(count)
+    except (OSError, UnicodeDecodeError):
+        return None
+    t = re.search(r"^<count>([0-9A-Fa-f]+)</count>", line.strip())
+    return int(t.group(1), 16) if t else None
+
+
+def count_newer(count, other):
+    """True if `count` was written after `other`, comparing modulo 2**16 so that 0000 follows FFFF"""
+    return 0 < (count - other) % COUNT_MODULO < COUNT_MODULO // 2
+
+
+def next_count(count):
+    """Count of the save after `count` (None for an empty slot)"""
+    return ((count or 0) + 1) % COUNT_MODULO
+
+
+def newest(counts):
+    """The bank of {bank: count} with the newest count, None if empty; A wins a tie"""
+    latest = None
+    for bank in sorted(counts):
+        if latest is None or count_newer(counts[bank], counts[latest]):
+            latest = bank
+    return latest
+
+
+def get_latest(path, memslot):
+    """Return (bank, count) of the slot's active bank: the readable bank with the newest count"""
+    with stats.timer('bank.resolve'):
+        counts = {}
+        for mem_sec in 'AB':
+            count = read_count(f'{path}/MEMORY{memslot:03}{mem_sec}.RC0')
+            if count is not None:
+                counts[mem_sec] = count
+
+        latest = newest(counts)
+        if latest is None:
+            raise ValueError(f'No readable bank for memory {memslot:03} in {path}')
+        return latest, counts[latest]
+
 
-    m = max(*counts)
-    max_index = counts.index(m)
-    return letters[max_index], m
+def active_bank(path, memslot):
+    """(bank, count) of the slot's active bank, (None, None) if it has no readable bank"""
+    try:
+        return get_latest(path, memslot)
+    except ValueError:
+        return None, None
+
+
+class StaleBankError(ValueError):
+    """The slot was saved by another writer since the patch was read"""
+
+
+def check_latest(path, memslot, mem_sec, count):
+    """Raise StaleBankError unless (mem_sec, count) is still the slot's active bank"""
+    latest = active_bank(path, memslot)
+    if latest != (mem_sec, count):
+        stats.count('save.conflict')
+        raise StaleBankError(f"memory {memslot:03} changed on the card since it was read "
+                             f"(bank {mem_sec} count {count} -> bank {latest[0]} count {latest[1]})")
 
 
 def from_rc600_xml(line):
@@ -57,33 +113,65 @@ def to_rc600_xml(line):
 
 
 def parse_rc600_tree(xml_path):
-    with open(xml_path, encoding="utf-8") as f:
-        xml_content = ''
-        for line in f.readlines():
-            xml_content += from_rc600_xml(line)
+    with stats.timer('file.read'):
+        with open(xml_path, encoding="utf-8") as f:
+            lines = f.readlines()
+
+    return parse_rc600_lines(lines)
 
+
+def parse_rc600_lines(lines):
+    with stats.timer('xml.rewrite'):
+        xml_content = ''.join(from_rc600_xml(line) for line in lines)
+    stats.count('chars.read', len(xml_content))
+
+    with stats.timer('xml.parse'):
         root = ET.fromstring(xml_content)
-        tree = ET.ElementTree(root)
-        return tree
+    return ET.ElementTree(root)
 
 
-def save_xml_to_rc600(tree, memslot, mem_sec, count, volume_path='.'):
-    buffer = BytesIO()
-    tree.write(buffer, encoding='utf-8', xml_declaration=False)
+def serialize_rc600(tree):
+    """Return the text of a bank file for `tree`, without the count line"""
+    with stats.timer('xml.serialize'):
+        buffer = BytesIO()
+        tree.write(buffer, encoding='utf-8', xml_declaration=False)
+        lines = buffer.getvalue().decode('utf-8').split('\n')
+
     # Get string and fix the tag names
-    new_mem_sec = 'A' if mem_sec == 'B' else 'B'
+    with stats.timer('xml.rewrite'):
+        body = ''.join(to_rc600_xml(line) + '\n' for line in lines)
+
+    return '<?xml version="1.0" encoding="utf-8"?>\n' + body
+
+
+def save_xml_to_rc600(tree, memslot, mem_sec, count, volume_path='.', check=True):
+    """
+    Write a patch to the bank after (mem_sec, count), the active bank it was
+    read from (None, None for an empty slot). The slot is locked for the
+    write and, with `check`, StaleBankError is raised if another writer
+    saved the slot since, instead of both writing the same bank and count.
+    """
+    body = serialize_rc600(tree)
+
+    new_mem_sec = 'B' if mem_sec == 'A' else 'A'
     output_xml = f'MEMORY{memslot:03}{new_mem_sec}.RC0'
     output_xml_path = os.path.join(volume_path, output_xml)
-    lines = buffer.getvalue().decode('utf-8').split('\n')
-    with open(output_xml_path, 'w', encoding='utf-8') as f:
-        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
-        for line in lines:
-            # print(line)
-            f.write(to_rc600_xml(line)+'\n')
-        count += 1
-        f.write('<count>{:04X}</count>'.format(count))
-
-    print(f'Saved to: {output_xml_path}')
+    with slot_lock(volume_path, memslot):
+        if check:
+            check_latest(volume_path, memslot, mem_sec, count)
+        count = next_count(count)
+        with stats.timer('file.write'):
+            with open(output_xml_path, 'w', encoding='utf-8') as f:
+                f.write(body)
+                f.write('<count>{:04X}</count>'.format(count))
+                f.flush()
+                with stats.timer('file.fsync'):
+                    os.fsync(f.fileno())
+    stats.count('chars.written', len(body))
+    stats.count('patches.saved')
+
+    log.info('Saved to: %s', output_xml_path)
+    return new_mem_sec, count
 
 
 def get_mem_file(cwd, memslot):
@@ -91,9 +179,18 @@ def get_mem_file(cwd, memslot):
     return f'{cwd}/MEMORY{memslot:03}{mem_sec}.RC0', mem_sec, count
 
 
+def same_tree(a, b):
+    """True if two elements have the same tags, attributes and texts all the way down"""
+    if a.tag != b.tag or (a.text or '') != (b.text or '') or a.attrib != b.attrib or len(a) != len(b):
+        return False
+    return all(same_tree(x, y) for x, y in zip(a, b))
+
+
 class Track:
-    def __init__(self, node):
+    def __init__(self, node, audio=None, memory=None):
         self.node = node
+        self.audio = audio  # WAV header info from rc600_audio, None if the track has no recording
+        self.memory = memory  # Memory the track belongs to, marked dirty when a setting changes
 
     def __str__(self):
         return self.node.tag
@@ -112,9 +209,17 @@ class Track:
 
     def _set_param(self, tag, value):
         """Set parameter value by tag"""
-        elem = self.node.find(tag)
-        if elem is not None:
-            elem.text = str(int(value))
+        with stats.timer('tree.mutate'):
+            elem = self.node.find(tag)
+            if elem is not None:
+                self._set_text(elem, str(int(value)))
+
+    def _set_text(self, elem, text):
+        """Set an element's text, marking the Memory dirty only if it changes"""
+        if elem.text != text:
+            elem.text = text
+            if self.memory is not None:
+                self.memory.dirty = True
 
     # Playback Settings
     @property
@@ -264,6 +369,25 @@ class Track:
     def quantize(self, value):
         self._set_param('P', value)
 
+    # Recorded audio (filled in by rc600_audio.WaveIndex.attach)
+    @property
+    def has_audio(self):
+        return self.audio is not None
+
+    @property
+    def duration(self):
+        """Loop length in seconds"""
+        return self.audio['duration'] if self.audio else None
+
+    @property
+    def sample_rate(self):
+        return self.audio['sample_rate'] if self.audio else None
+
+    @property
+    def audio_size(self):
+        """Size of the WAV file in bytes"""
+        return self.audio['size'] if self.audio else None
+
     # Legacy input setup property (keep for compatibility)
     @property
     def input_setup(self):
@@ -291,13 +415,16 @@ class Track:
                 'mic1')
         args = [rythm, inst2r, inst2l, inst1r, inst1l, mic2, mic1]
         num = sum([int(arg if arg is not None else input_setup[keys[i]]) << (6 - i) for i, arg in enumerate(args)])
-        self.node.find('Q').text = str(num)
+        with stats.timer('tree.mutate'):
+            self._set_text(self.node.find('Q'), str(num))
 
         return num
 
 
 class Memory:
     cwd = '.'
+    audio = None  # per-track WAV info, see rc600_audio.WaveIndex.attach
+    dirty = False  # set by the setters when a value actually changes, cleared by save()
 
     def __init__(self, slot, cwd=None):
         self.slot = slot
@@ -305,37 +432,98 @@ class Memory:
             self.cwd = cwd
 
         self._name = None
+        self.dirty = False
         self.root = self.read()
 
     def read(self):
         (xml_path, seq, count) = get_mem_file(self.cwd, self.slot)
-        print("Opening: ", xml_path)
+        log.info('Opening: %s', xml_path)
         self.xml_path = xml_path
         self.seq = seq
         self.count = count
+        stats.count('patches.loaded')
         return parse_rc600_tree(self.xml_path)
 
-    def save(self, to_dir=None, slot=None):
+    @classmethod
+    def from_bytes(cls, slot, content, seq, count, cwd=None):
+        """Build a Memory from the bytes of its active bank without reading the card"""
+        m = cls.__new__(cls)
+        m.slot = slot
+        if cwd:
+            m.cwd = cwd
+        m._name = None
+        m.dirty = False
+        m.xml_path = f'{m.cwd}/MEMORY{slot:03}{seq}.RC0'
+        m.seq = seq
+        m.count = count
+        stats.count('patches.loaded')
+        m.root = parse_rc600_lines(content.decode('utf-8').splitlines(True))
+        return m
+
+    def save(self, to_dir=None, slot=None, force=False, rebase=False):
+        """
+        Write the patch to the next bank. A clean patch saved back to its own
+        slot is skipped unless `force`; returns True if a file was written.
+
+        If the slot was saved by someone else since it was read this raises
+        StaleBankError, or with `rebase` writes after their bank instead
+        (this patch's content wins).
+        """
+        same_dir = not to_dir or os.path.abspath(to_dir) == os.path.abspath(self.cwd)
+        in_place = same_dir and (not slot or slot == self.slot)
+        if in_place and not self.dirty and not force:
+            stats.count('patches.clean')
+            return False
+
         if not to_dir:
             to_dir = self.cwd
 
         if slot:
             self.slot = slot
 
-        save_xml_to_rc600(self.root, self.slot, self.seq, self.count, to_dir)
+        # Saving over another slot goes after that slot's own active bank
+        seq, count = (self.seq, self.count) if in_place else active_bank(to_dir, self.slot)
+        try:
+            seq, count = save_xml_to_rc600(self.root, self.slot, seq, count, to_dir)
+        except StaleBankError:
+            if not rebase:
+                raise
+            seq, count = save_xml_to_rc600(self.root, self.slot, *active_bank(to_dir, self.slot), to_dir)
+        if same_dir:
+            # The bank just written is the active one now
+            self.seq, self.count = seq, count
+            self.xml_path = f'{self.cwd}/MEMORY{self.slot:03}{seq}.RC0'
+            self.dirty = False
+        return True
+
+    def set_value(self, path, text):
+        """Set the text of the element at `path`, marking the patch dirty if it changes"""
+        element = self.root.find(path)
+        if element is None:
+            raise ValueError(f"{path} not found in memory {self.slot:03}")
+        if element.text == text:
+            return False
+        with stats.timer('tree.mutate'):
+            element.text = text
+        self.dirty = True
+        self._name = None
+        return True
 
     @property
     def name(self):
         if not self._name:
+            from rc600_names import decode
+
             mem = self.root.find('mem')
             name_element = mem.find('NAME')
-            self._name = ''.join([chr(int(child.text)) for child in name_element]).strip()
+            self._name = decode(child.text for child in name_element)
         return self._name
 
     @property
     def tracks(self):
         mem = self.root.find('mem')
-        return [Track(mem.find(f'TRACK{n}')) for n in range(1, 7)]
+        audio = self.audio or [None] * 6
+        return [Track(mem.find(f'TRACK{n}'), audio[n - 1], self) for n in range(1, 7)]
 
     @property
     def bpm(self):
@@ -355,11 +543,15 @@ class Memory:
 
     @name.setter
     def name(self, value):
-        mem = self.root.find('mem')
-        value = f'{value}            '
-        name_element = mem.find('NAME')
-        for index, child in enumerate(name_element):
-            child.text = str(ord(value[index]))
+        from rc600_names import encode
+
+        with stats.timer('tree.mutate'):
+            mem = self.root.find('mem')
+            name_element = mem.find('NAME')
+            for child, code in zip(name_element, encode(value, len(name_element))):
+                if child.text != str(code):
+                    child.text = str(code)
+                    self.dirty = True
 
         self._name = None
 
@@ -380,16 +572,20 @@ class Memory:
         parent = target.root.find('/'.join(parts))
         assert parent is not None, f"Couldn't find parent node: {path}"
 
-        new_node = copy.deepcopy(source)
-        for key in new_node.keys():
-            new_node.set(key, old_node.get(key))
-
-        for i, child in enumerate(list(parent)):
-            if child is old_node:
-                parent.remove(child)
-                cp = copy.deepcopy(new_node)
-                parent.insert(i, cp)
-                return cp
+        with stats.timer('tree.mutate'):
+            new_node = copy.deepcopy(source)
+            for key in new_node.keys():
+                new_node.set(key, old_node.get(key))
+            if same_tree(old_node, new_node):
+                return old_node
+            target.dirty = True
+
+            for i, child in enumerate(list(parent)):
+                if child is old_node:
+                    parent.remove(child)
+                    cp = copy.deepcopy(new_node)
+                    parent.insert(i, cp)
+                    return cp
 
     def __str__(self):
         return f"Patch: '{self.name}',{self.slot} {self.seq}"
@@ -436,57 +632,65 @@ def do_test():
     pass
 
 
-def update_names(source='./lista.csv'):
+def update_names(source='./lista.csv', dry_run=False):
     """
     given a csv file, updates the names in the memory
+    rows are grouped by slot and validated first; only slots whose name
+    actually changes are written, and bad rows are reported, not fatal
     """
-    with open(source, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            print(int(row['Banco']))
-            mem = Memory(int(row['Banco']))
-            print(mem, row['ShortName'])
-            mem.name = row['ShortName']
-            mem.save()
-            # mem.name = row['ShortName']
-
-
-def update_inputs():
+    from rc600_batch import rename_from_csv
+
+    result = rename_from_csv(source, Memory.cwd, dry_run=dry_run)
+    print(result)
+    return result
+
+
+def update_inputs(dry_run=False):
     """
         set mic inputs muted for record but only tracks 5 and 6 mic2 on
+        only slots whose inputs actually change are written
     """
-    for ix in range(17, 55):
-        mem = Memory(ix)
-        for track in mem.tracks:
-            track.update_setup(mic1=0)
-            track.update_setup(mic2=0)
-        mem.tracks[4].update_setup(mic2=1)
-        mem.tracks[5].update_setup(mic2=1)
-        mem.save()
+    from rc600_plan import Plan
+
+    slots = range(17, 55)
+    # Hold the slots from the first read to the last write (nothing to hold for a dry run)
+    with CardLock(Memory.cwd, slots if not dry_run else ()):
+        plan = Plan(Memory.cwd)
+        for ix in slots:
+            mem = Memory(ix)
+            for track in mem.tracks:
+                track.update_setup(mic1=0)
+                track.update_setup(mic2=0)
+            mem.tracks[4].update_setup(mic2=1)
+            mem.tracks[5].update_setup(mic2=1)
+            plan.add_memory(mem, 'inputs')
+
+        print(plan)
+        if not dry_run:
+            plan.execute()
+    return plan
 
 
 def armar_set():
-    file = './2025-11-13-Recital.csv'
-    with open(file, 'r') as f:
-        reader = csv.DictReader(f)
-        slot = 1
-        for row in reader:
-            # print(int(row['Banco']))
-            mem = Memory(int(row['Banco']))
-            mem.name = row['ShortName']
-            print(f'Saved {slot}: {mem.name}')
-            mem.save(slot=slot)
-            slot += 1
+    armar_set_with_file('./2025-11-13-Recital.csv')
+
+
+def parse_slots(value):
+    """'0-99' -> range(0, 100), for the --slots option of the command-line tools"""
+    first, _, last = value.partition('-')
+    return range(int(first), int(last or first) + 1)
+
+
+def default_data_path():
+    """DATA folder for the command-line tools when --data isn't given: $RC600_DATA, the mounted card or ./DATA"""
+    return os.environ.get('RC600_DATA') or next((path for path in DEFAULT_DATA_PATHS if os.path.exists(path)), './DATA')
 
 
 def get_data_path():
     """
     Prompt user for DATA path with intelligent defaults
     """
-    default_paths = [
-        '/Volumes/RC-600/ROLAND/DATA',
-        './DATA'
-    ]
+    default_paths = list(DEFAULT_DATA_PATHS)
 
     print("\n=== RC-600 Patch Manager ===\n")
     print("Available DATA paths:")
@@ -581,35 +785,114 @@ def list_memories(start, end):
     """
     List memory slots with their details
     """
-    for i in range(start, end):
-        try:
-            m = Memory(i)
-            print(f"{i:3d} | Bank: {m.seq} | Count: {m.count:04X} | Name: {m.name}")
-        except Exception as e:
-            print(f"{i:3d} | Error: {e}")
+    from rc600_scan import scan
+
+    for row in scan(Memory.cwd, range(start, end)):
+        if 'error' in row:
+            print(f"{row['slot']:3d} | Error: {row['error']}")
+        else:
+            print(f"{row['slot']:3d} | Bank: {row['bank']} | Count: {row['count']:04X} | Name: {row['name']}")
 
 
-def armar_set_with_file(csv_file=None):
+def armar_set_with_file(csv_file=None, dry_run=False):
     """
     Create setlist from CSV file
+    only destination slots that don't already hold the patch are written
     """
+    from rc600_setlist import build_setlist, read_setlist_csv
+
     if not csv_file:
         csv_file = './2025-11-13-Recital.csv'
 
-    with open(csv_file, 'r') as f:
-        reader = csv.DictReader(f)
-        slot = 1
-        for row in reader:
-            mem = Memory(int(row['Banco']))
-            mem.name = row['ShortName']
-            print(f'Saved {slot}: {mem.name}')
-            mem.save(slot=slot)
-            slot += 1
-
-
-if __name__ == '__main__':
-    PROJECT_PATH = get_data_path()
+    plan = build_setlist(read_setlist_csv(csv_file), Memory.cwd, dry_run=dry_run)
+    print(plan)
+    return plan
+
+
+def run_command(args):
+    """Run a headless CLI command (no menu, no prompts)"""
+    if args.command == 'list':
+        list_memories(args.start, args.end)
+    elif args.command == 'names':
+        update_names(args.csv, args.dry_run)
+    elif args.command == 'inputs':
+        update_inputs(args.dry_run)
+    elif args.command == 'setlist':
+        armar_set_with_file(args.csv, args.dry_run)
+
+
+def run_session_command(args):
+    """Run a CLI command on a RAM copy of the card, then flush the changed slots in one batch"""
+    from rc600_session import Session, format_summary
+
+    session = Session.open(PROJECT_PATH)
+    try:
+        Memory.cwd = session.path
+        run_command(args)
+        Memory.cwd = PROJECT_PATH
+        summary = session.flush()
+    except StaleBankError:
+        # Keep the edits: they can be flushed again with rc600_session.py once the conflicts are sorted out
+        print(f"Changed on the card meanwhile: {', '.join(f'{slot:03}' for slot in session.conflicts())}; "
+              f"the session is kept in {session.work_dir}")
+        raise
+    except BaseException:
+        session.discard()
+        raise
+    finally:
+        Memory.cwd = PROJECT_PATH
+    session.discard()
+    print(summary['plan'])
+    print(format_summary(summary))
+
+
+def main(argv=None):
+    global PROJECT_PATH
+
+    parser = argparse.ArgumentParser(description="RC-600 Patch Manager")
+    parser.add_argument('--data', default=os.environ.get('RC600_DATA'),
+                        help="DATA path (skips the path prompt; default: $RC600_DATA)")
+    parser.add_argument('--profile', action='store_true', help="collect timings and print them on exit")
+    parser.add_argument('--verbose', action='store_true', help="print every bank file read and written")
+    parser.add_argument('--session', action='store_true',
+                        help="run the command on a local copy of the card and write the changed slots at the end")
+    commands = parser.add_subparsers(dest='command', help="run a single command instead of the menu")
+    list_parser = commands.add_parser('list', help="list memory slots")
+    list_parser.add_argument('start', type=int, nargs='?', default=30)
+    list_parser.add_argument('end', type=int, nargs='?', default=40)
+    names_parser = commands.add_parser('names', help="update patch names from CSV")
+    names_parser.add_argument('csv', nargs='?', default='./lista.csv')
+    inputs_parser = commands.add_parser('inputs', help="configure track inputs (mic settings)")
+    setlist_parser = commands.add_parser('setlist', help="create setlist from CSV")
+    setlist_parser.add_argument('csv', nargs='?', default='./2025-11-13-Recital.csv')
+    for command_parser in (names_parser, inputs_parser, setlist_parser):
+        command_parser.add_argument('--dry-run', action='store_true', help="print the planned writes without writing")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        stats.enable()
+    # The menu reports each file it touches; single commands only when asked to
+    logging.basicConfig(format='%(message)s', level=logging.INFO if args.verbose or not args.command else logging.WARNING)
+
+    PROJECT_PATH = args.data or get_data_path()
     Memory.cwd = PROJECT_PATH
     print(f"\nUsing DATA path: {PROJECT_PATH}\n")
 
-    show_menu()
+    try:
+        if args.command and args.session:
+            run_session_command(args)
+        elif args.command:
+            run_command(args)
+        else:
+            show_menu()
+    except StaleBankError as e:
+        print(f"Error: {e}")
+        return 1
+    finally:
+        if args.profile:
+            print("\n" + stats.report())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
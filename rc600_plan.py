@@ -0,0 +1,168 @@
+"""
+RC-600 write planner
+Works out the bank files a job has to write from the current card state.
+Planned content is compared with the slot's active bank by hash (ignoring
+the count line), so slots that already hold it are skipped and re-running
+an idempotent job writes nothing.
+
+Each entry remembers the bank and count it was planned against. execute()
+locks the slots it writes and fails with StaleBankError before writing
+anything if another writer saved one of them in the meantime.
+"""
+
+import hashlib
+import os
+import re
+
+import rc600_stats as stats
+from rc600_lock import slot_locks
+from rc600_patch_manager import Memory, check_latest, get_latest, next_count, serialize_rc600
+
+COUNT_LINE = re.compile(rb'<count>[0-9A-Fa-f]+</count>\s*$')
+
+
+def strip_count(content):
+    """Return the bytes of a bank file without its count line"""
+    match = COUNT_LINE.search(content)
+    return content[:match.start()] if match else content
+
+
+def content_hash(content):
+    """Hash of a bank file's content, ignoring the count line"""
+    return hashlib.sha1(strip_count(content)).hexdigest()
+
+
+def set_count(content, count):
+    """Return the bytes of a bank file with its count line set to `count`"""
+    return strip_count(content) + b'<count>%04X</count>' % count
+
+
+def read_active(path, slot):
+    """Return (content, bank, count) of a slot's active bank"""
+    bank, count = get_latest(path, slot)
+    with stats.timer('file.read'):
+        with open(os.path.join(path, f'MEMORY{slot:03}{bank}.RC0'), 'rb') as f:
+            return f.read(), bank, count
+
+
+def next_bank(bank, count):
+    """Bank and count of the next save after (bank, count); bank A, count 1 for an empty slot"""
+    if bank is None:
+        return 'A', 1
+    return ('A' if bank == 'B' else 'B'), next_count(count)
+
+
+class Plan:
+    """
+    Writes of a job, keyed by slot in the order they were added. Each entry
+    is a dict with 'slot', 'description', 'file', 'count', 'content'
+    (None when the slot already holds the planned content) and 'expected',
+    the (bank, count) the slot had when the entry was planned. Adding a slot
+    twice keeps the last content, like saving it twice would.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Memory.cwd
+        self.entries = {}
+        self.current = {}  # slot -> (hash, bank, count) of the active bank
+
+    def active(self, slot):
+        if slot not in self.current:
+            try:
+                content, bank, count = read_active(self.path, slot)
+                self.current[slot] = (content_hash(content), bank, count)
+            except ValueError:
+                self.current[slot] = (None, None, None)
+        return self.current[slot]
+
+    def read(self, slot):
+        """Read a slot's active bank, remembering its hash so add() doesn't read it again"""
+        content, bank, count = read_active(self.path, slot)
+        self.current[slot] = (content_hash(content), bank, count)
+        return content
+
+    def add(self, slot, content, description=''):
+        """Plan `content` (bank file bytes, count line optional) for a slot; returns True if it needs a write"""
+        digest, active_bank, active_count = self.active(slot)
+        bank, count = next_bank(active_bank, active_count)
+        changed = content_hash(content) != digest
+        self.entries[slot] = {
+            'slot': slot,
+            'description': description,
+            'file': os.path.join(self.path, f'MEMORY{slot:03}{bank}.RC0'),
+            'count': count,
+            'content': set_count(content, count) if changed else None,
+            'expected': (active_bank, active_count),
+        }
+        return changed
+
+    def add_memory(self, mem, description=''):
+        """
+        Plan the current state of a (possibly modified) Memory for its slot.
+        A clean Memory still matching the slot's active bank isn't serialized.
+        """
+        if not mem.dirty and os.path.abspath(mem.cwd) == os.path.abspath(self.path) \
+                and get_latest(self.path, mem.slot) == (mem.seq, mem.count):
+            stats.count('patches.clean')
+            bank, count = next_bank(mem.seq, mem.count)
+            self.entries[mem.slot] = {
+                'slot': mem.slot,
+                'description': description,
+                'file': os.path.join(self.path, f'MEMORY{mem.slot:03}{bank}.RC0'),
+                'count': count,
+                'content': None,
+                'expected': (mem.seq, mem.count),
+            }
+            return False
+        return self.add(mem.slot, serialize_rc600(mem.root).encode('utf-8'), description)
+
+    @property
+    def slots(self):
+        return list(self.entries)
+
+    @property
+    def writes(self):
+        return [entry for entry in self.entries.values() if entry['content'] is not None]
+
+    @property
+    def unchanged(self):
+        return [entry for entry in self.entries.values() if entry['content'] is None]
+
+    def execute(self, on_write=None):
+        """
+        Write the planned files with their slots locked against other
+        processes and threads; returns the list of files written. Raises
+        StaleBankError, writing nothing, if a slot was saved by someone
+        else since it was planned. `on_write(entry)` is called after each
+        file is written and synced.
+        """
+        writes = self.writes
+        with slot_locks(self.path, [entry['slot'] for entry in writes]):
+            for entry in writes:
+                check_latest(self.path, entry['slot'], *entry['expected'])
+
+            written = []
+            for entry in writes:
+                with stats.timer('file.write'):
+                    with open(entry['file'], 'wb') as f:
+                        f.write(entry['content'])
+                        f.flush()
+                        with stats.timer('file.fsync'):
+                            os.fsync(f.fileno())
+                stats.count('patches.saved')
+                written.append(entry['file'])
+                if on_write is not None:
+                    on_write(entry)
+        stats.count('plan.skipped', len(self.unchanged))
+        return written
+
+    def __str__(self):
+        lines = []
+        for entry in self.entries.values():
+            if entry['content'] is None:
+                lines.append(f"  skip  {entry['slot']:03} (unchanged) {entry['description']}")
+            else:
+                lines.append(f"  write {entry['slot']:03} -> {os.path.basename(entry['file'])} "
+                             f"(count {entry['count']:04X}) {entry['description']}")
+        lines.append(f"{len(self.writes)} writes, {len(self.unchanged)} unchanged")
+        return '\n'.join(lines)
@@ -0,0 +1,1065 @@
+"""
+RC-600 Patch Manager TUI screens
+Secondary screens, imported on first use so the TUI starts with MainScreen only
+"""
+
+import os
+from textual import on
+from textual.app import ComposeResult
+from textual.containers import Container, Horizontal, VerticalScroll
+from textual.widgets import (
+    Header, Footer, Button, Static, Input,
+    DataTable, Label, RadioSet, RadioButton,
+    Switch, RichLog
+)
+from textual.screen import Screen, ModalScreen
+from textual.binding import Binding
+
+import rc600_stats as stats
+from rc600_patch_manager import Memory, update_names
+
+
+class PathSelectionScreen(ModalScreen[str]):
+    """Modal screen for selecting DATA path"""
+
+    CSS = """
+    PathSelectionScreen {
+        align: center middle;
+    }
+
+    #path-dialog {
+        width: 70;
+        height: auto;
+        border: thick $background 80%;
+        background: $surface;
+        padding: 1 2;
+    }
+
+    #path-title {
+        width: 100%;
+        content-align: center middle;
+        text-style: bold;
+        color: $accent;
+        margin-bottom: 1;
+    }
+
+    .path-option {
+        margin: 1 0;
+    }
+
+    #custom-path-input {
+        margin: 1 0;
+    }
+
+    #path-buttons {
+        width: 100%;
+        height: auto;
+        align: center middle;
+        margin-top: 1;
+    }
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.default_paths = [
+            '/Volumes/RC-600/ROLAND/DATA',
+            './DATA'
+        ]
+
+    def compose(self) -> ComposeResult:
+        with Container(id="path-dialog"):
+            yield Label("Select DATA Path", id="path-title")
+
+            with RadioSet(id="path-radio"):
+                for i, path in enumerate(self.default_paths):
+                    exists = os.path.exists(path)
+                    status = "[green]EXISTS[/]" if exists else "[dim]not found[/]"
+                    yield RadioButton(f"{path} {status}", value=path, id=f"path-{i}")
+                yield RadioButton("Custom path", value="custom", id="path-custom")
+
+            yield Input(
+                placeholder="Enter custom path...",
+                id="custom-path-input",
+                disabled=True
+            )
+
+            with Horizontal(id="path-buttons"):
+                yield Button("OK", variant="primary", id="path-ok")
+                yield Button("Cancel", variant="default", id="path-cancel")
+
+    @on(RadioSet.Changed)
+    def radio_changed(self, event: RadioSet.Changed) -> None:
+        """Enable custom input when custom is selected"""
+        custom_input = self.query_one("#custom-path-input", Input)
+        custom_input.disabled = event.pressed.id != "path-custom"
+        if not custom_input.disabled:
+            custom_input.focus()
+
+    @on(Button.Pressed, "#path-ok")
+    def handle_ok(self) -> None:
+        """Handle OK button press"""
+        radio_set = self.query_one("#path-radio", RadioSet)
+
+        if radio_set.pressed_button and radio_set.pressed_button.id == "path-custom":
+            custom_input = self.query_one("#custom-path-input", Input)
+            path = custom_input.value.strip()
+            if path:
+                self.dismiss(path)
+            else:
+                return
+        elif radio_set.pressed_button:
+            # Get the index from the button ID to retrieve the actual path
+            button_id = radio_set.pressed_button.id
+            if button_id.startswith("path-") and button_id != "path-custom":
+                index = int(button_id.split("-")[1])
+                self.dismiss(self.default_paths[index])
+            else:
+                return
+
+    @on(Button.Pressed, "#path-cancel")
+    def handle_cancel(self) -> None:
+        """Handle cancel button press"""
+        self.dismiss(None)
+
+
+class UpdateNamesScreen(Screen):
+    """Screen for updating patch names from CSV"""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Back"),
+    ]
+
+    CSS = """
+    UpdateNamesScreen {
+        align: center middle;
+    }
+
+    #update-container {
+        width: 80;
+        height: auto;
+        background: $surface;
+        border: thick $primary;
+        padding: 1 2;
+    }
+
+    .form-field {
+        margin: 1 0;
+    }
+
+    #update-buttons {
+        width: 100%;
+        height: auto;
+        align: center middle;
+        margin-top: 2;
+    }
+    """
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        with Container(id="update-container"):
+            yield Label("Update Patch Names from CSV", classes="form-field")
+            yield Input(
+                placeholder="./lista.csv",
+                value="./lista.csv",
+                id="csv-filename"
+            )
+            yield Label("", id="status-message", classes="form-field")
+
+            with Horizontal(id="update-buttons"):
+                yield Button("Update", variant="primary", id="update-btn")
+                yield Button("Back", variant="default", id="back-btn")
+        yield Footer()
+
+    @on(Button.Pressed, "#update-btn")
+    def handle_update(self) -> None:
+        """Handle update button"""
+        csv_input = self.query_one("#csv-filename", Input)
+        status = self.query_one("#status-message", Label)
+
+        try:
+            result = update_names(csv_input.value)
+            summary = f"{len(result.writes)} written, {len(result.unchanged)} unchanged"
+            if result.errors:
+                line, _, message = min(result.errors, key=lambda error: error[0])
+                status.update(f"[yellow]Names updated with {len(result.errors)} row errors ({summary}); "
+                              f"line {line}: {message}[/]")
+            else:
+                status.update(f"[green]✓ Patch names updated! ({summary})[/]")
+        except Exception as e:
+            status.update(f"[red]✗ Error: {e}[/]")
+
+    @on(Button.Pressed, "#back-btn")
+    def handle_back(self) -> None:
+        """Go back to main screen"""
+        self.app.pop_screen()
+
+
+class CreateSetlistScreen(Screen):
+    """Screen for creating setlist from CSV"""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Back"),
+    ]
+
+    CSS = """
+    CreateSetlistScreen {
+        align: center middle;
+    }
+
+    #setlist-container {
+        width: 80;
+        height: auto;
+        background: $surface;
+        border: thick $primary;
+        padding: 1 2;
+    }
+
+    .form-field {
+        margin: 1 0;
+    }
+
+    #setlist-buttons {
+        width: 100%;
+        height: auto;
+        align: center middle;
+        margin-top: 2;
+    }
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.created_slots = []
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        with Container(id="setlist-container"):
+            yield Label("Create Setlist from CSV", classes="form-field")
+            yield Input(
+                placeholder="./2025-11-13-Recital.csv",
+                value="./2025-11-13-Recital.csv",
+                id="setlist-filename"
+            )
+            yield Label("", id="status-message", classes="form-field")
+
+            with Horizontal(id="setlist-buttons"):
+                yield Button("Create", variant="primary", id="create-btn")
+                yield Button("Back", variant="default", id="back-btn")
+        yield Footer()
+
+    @on(Button.Pressed, "#create-btn")
+    def handle_create(self) -> None:
+        """Handle create button"""
+        csv_input = self.query_one("#setlist-filename", Input)
+        status = self.query_one("#status-message", Label)
+
+        try:
+            from rc600_setlist import build_setlist, read_setlist_csv
+
+            plan = build_setlist(read_setlist_csv(csv_input.value), Memory.cwd)
+            self.created_slots = plan.slots
+            status.update(f"[green]✓ Setlist created successfully! ({len(plan.slots)} patches, "
+                          f"{len(plan.writes)} written)[/]")
+        except Exception as e:
+            status.update(f"[red]✗ Error: {e}[/]")
+
+    @on(Button.Pressed, "#back-btn")
+    def handle_back(self) -> None:
+        """Go back to main screen"""
+        self.app.pop_screen()
+
+
+class CopyPatchScreen(Screen):
+    """Screen for copying patch settings to other patches"""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Back"),
+    ]
+
+    CSS = """
+    CopyPatchScreen {
+    }
+
+    #copy-container {
+        layout: vertical;
+        width: 100%;
+        height: 100%;
+        background: $surface;
+        padding: 1 2;
+    }
+
+    #copy-title {
+        width: 100%;
+        text-style: bold;
+        color: $accent;
+        height: auto;
+    }
+
+    #copy-options {
+        width: 100%;
+        height: auto;
+        padding: 1;
+        border: solid $primary;
+    }
+
+    #copy-options Label {
+        height: auto;
+    }
+
+    #copy-options Horizontal {
+        height: auto;
+        margin: 0;
+    }
+
+    #copy-options Button {
+        min-width: 15;
+    }
+
+    #target-section-label {
+        width: 100%;
+        height: auto;
+        margin-top: 1;
+    }
+
+    #target-list-container {
+        width: 100%;
+        height: 1fr;
+        border: solid $primary;
+    }
+
+    #target-table {
+        width: 100%;
+        height: 100%;
+    }
+
+    #copy-buttons {
+        width: 100%;
+        height: auto;
+        align: center middle;
+        margin-top: 1;
+    }
+
+    .option-label {
+        margin: 0 1 0 0;
+        width: auto;
+    }
+    """
+
+    def __init__(self, source_slot: int, source_name: str):
+        super().__init__()
+        self.source_slot = source_slot
+        self.source_name = source_name
+        self.selected_targets = set()
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        with Container(id="copy-container"):
+            yield Label(f"Copy from Slot {self.source_slot:02d}: {self.source_name}", id="copy-title")
+
+            # Copy options
+            with Container(id="copy-options"):
+                yield Label("[bold]Copy Options:[/bold]")
+                with Horizontal():
+                    yield Label("Effects (IFX/TFX):", classes="option-label")
+                    yield Button("Copy Effects", id="copy-effects-toggle", variant="default")
+                with Horizontal():
+                    yield Label("Assigns:", classes="option-label")
+                    yield Button("All (1-16)", id="copy-assigns-all-toggle", variant="default")
+                    yield Button("1-8", id="copy-assigns-1-8-toggle", variant="default")
+                    yield Button("9-16", id="copy-assigns-9-16-toggle", variant="default")
+
+            # Target selection
+            yield Label("[bold]Select Target Patches:[/bold]", id="target-section-label")
+            with Container(id="target-list-container"):
+                table = DataTable(id="target-table", zebra_stripes=True, cursor_type="row")
+                table.add_columns("Select", "Slot", "Name")
+                yield table
+
+            with Horizontal(id="copy-buttons"):
+                yield Button("Copy to Selected", variant="primary", id="copy-btn")
+                yield Button("Select All", variant="default", id="select-all-btn")
+                yield Button("Deselect All", variant="default", id="deselect-all-btn")
+                yield Button("Back", variant="default", id="back-btn")
+        yield Footer()
+
+    def on_mount(self) -> None:
+        """Load target list when screen mounts"""
+        self.copy_effects = False
+        self.copy_assigns = set()
+        self.load_targets()
+
+    def load_targets(self) -> None:
+        """Load all patches except source into target table"""
+        table = self.query_one("#target-table", DataTable)
+        table.clear()
+
+        from rc600_scan import scan
+
+        for row in scan(Memory.cwd, [i for i in range(100) if i != self.source_slot]):
+            i = row['slot']
+            if 'error' in row:
+                table.add_row(" ", f"{i:02d}", "[red]Error[/]", key=str(i))
+                continue
+            name = row['name'] if row['name'] else "[empty]"
+            selected = "✓" if i in self.selected_targets else " "
+            table.add_row(selected, f"{i:02d}", name, key=str(i))
+
+    @on(DataTable.RowSelected)
+    def on_row_selected(self, event: DataTable.RowSelected) -> None:
+        """Toggle target selection"""
+        table = self.query_one("#target-table", DataTable)
+        slot = int(event.row_key.value)
+
+        # Toggle selection
+        if slot in self.selected_targets:
+            self.selected_targets.remove(slot)
+        else:
+            self.selected_targets.add(slot)
+
+        # Update only this row instead of reloading all patches
+        # Get the column key for the "Select" column (first column, index 0)
+        select_column = table.ordered_columns[0]
+        selected = "✓" if slot in self.selected_targets else " "
+        table.update_cell(event.row_key, select_column.key, selected)
+
+    @on(Button.Pressed, "#copy-effects-toggle")
+    def toggle_copy_effects(self) -> None:
+        """Toggle copy effects option"""
+        self.copy_effects = not self.copy_effects
+        btn = self.query_one("#copy-effects-toggle", Button)
+        btn.variant = "success" if self.copy_effects else "default"
+
+    @on(Button.Pressed, "#copy-assigns-all-toggle")
+    def toggle_copy_assigns_all(self) -> None:
+        """Toggle all assigns"""
+        if len(self.copy_assigns) == 16:
+            self.copy_assigns.clear()
+            self.query_one("#copy-assigns-all-toggle", Button).variant = "default"
+            self.query_one("#copy-assigns-1-8-toggle", Button).variant = "default"
+            self.query_one("#copy-assigns-9-16-toggle", Button).variant = "default"
+        else:
+            self.copy_assigns = set(range(1, 17))
+            self.query_one("#copy-assigns-all-toggle", Button).variant = "success"
+            self.query_one("#copy-assigns-1-8-toggle", Button).variant = "success"
+            self.query_one("#copy-assigns-9-16-toggle", Button).variant = "success"
+
+    @on(Button.Pressed, "#copy-assigns-1-8-toggle")
+    def toggle_copy_assigns_1_8(self) -> None:
+        """Toggle assigns 1-8"""
+        assigns_1_8 = set(range(1, 9))
+        if assigns_1_8.issubset(self.copy_assigns):
+            self.copy_assigns -= assigns_1_8
+            self.query_one("#copy-assigns-1-8-toggle", Button).variant = "default"
+        else:
+            self.copy_assigns |= assigns_1_8
+            self.query_one("#copy-assigns-1-8-toggle", Button).variant = "success"
+
+        # Update All button
+        if len(self.copy_assigns) == 16:
+            self.query_one("#copy-assigns-all-toggle", Button).variant = "success"
+        else:
+            self.query_one("#copy-assigns-all-toggle", Button).variant = "default"
+
+    @on(Button.Pressed, "#copy-assigns-9-16-toggle")
+    def toggle_copy_assigns_9_16(self) -> None:
+        """Toggle assigns 9-16"""
+        assigns_9_16 = set(range(9, 17))
+        if assigns_9_16.issubset(self.copy_assigns):
+            self.copy_assigns -= assigns_9_16
+            self.query_one("#copy-assigns-9-16-toggle", Button).variant = "default"
+        else:
+            self.copy_assigns |= assigns_9_16
+            self.query_one("#copy-assigns-9-16-toggle", Button).variant = "success"
+
+        # Update All button
+        if len(self.copy_assigns) == 16:
+            self.query_one("#copy-assigns-all-toggle", Button).variant = "success"
+        else:
+            self.query_one("#copy-assigns-all-toggle", Button).variant = "default"
+
+    @on(Button.Pressed, "#select-all-btn")
+    def select_all_targets(self) -> None:
+        """Select all targets"""
+        self.selected_targets = set(range(100)) - {self.source_slot}
+        self.load_targets()
+
+    @on(Button.Pressed, "#deselect-all-btn")
+    def deselect_all_targets(self) -> None:
+        """Deselect all targets"""
+        self.selected_targets.clear()
+        self.load_targets()
+
+    @on(Button.Pressed, "#copy-btn")
+    def handle_copy(self) -> None:
+        """Stage the copy operation"""
+        if not self.selected_targets:
+            self.notify("No targets selected!", severity="error")
+            return
+
+        if not self.copy_effects and not self.copy_assigns:
+            self.notify("No copy options selected!", severity="error")
+            return
+
+        # Create copy operation data
+        copy_operation = {
+            'source': self.source_slot,
+            'targets': list(self.selected_targets),
+            'copy_effects': self.copy_effects,
+            'copy_assigns': list(self.copy_assigns)
+        }
+
+        # Return the operation to be staged
+        self.dismiss(copy_operation)
+
+    @on(Button.Pressed, "#back-btn")
+    def handle_back(self) -> None:
+        """Go back to main screen"""
+        self.dismiss(None)
+
+
+class ListMemoriesScreen(Screen):
+    """Screen for listing memory slots"""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Back"),
+        Binding("r", "refresh", "Refresh"),
+    ]
+
+    CSS = """
+    ListMemoriesScreen {
+        align: center middle;
+    }
+
+    #list-container {
+        width: 90;
+        height: 40;
+        background: $surface;
+        border: thick $primary;
+        padding: 1 2;
+    }
+
+    #memory-table {
+        height: 1fr;
+        margin: 1 0;
+    }
+
+    #list-buttons {
+        width: 100%;
+        height: auto;
+        align: center middle;
+        margin-top: 1;
+    }
+    """
+
+    def __init__(self, start: int = 30, end: int = 40):
+        super().__init__()
+        self.start = start
+        self.end = end
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        with Container(id="list-container"):
+            yield Label(f"Memory Slots ({self.start}-{self.end-1})")
+
+            table = DataTable(id="memory-table")
+            table.add_columns("Slot", "Bank", "Count", "Name")
+            yield table
+
+            with Horizontal(id="list-buttons"):
+                yield Button("Refresh", variant="primary", id="refresh-btn")
+                yield Button("Back", variant="default", id="back-btn")
+        yield Footer()
+
+    def on_mount(self) -> None:
+        """Load data when screen mounts"""
+        self.load_memories()
+
+    def load_memories(self) -> None:
+        """Load memory slots into table"""
+        table = self.query_one("#memory-table", DataTable)
+        table.clear()
+
+        from rc600_scan import scan
+
+        for row in scan(Memory.cwd, range(self.start, self.end)):
+            if 'error' in row:
+                table.add_row(
+                    str(row['slot']),
+                    "-",
+                    "-",
+                    f"[red]Error: {row['error'][:30]}[/]"
+                )
+                continue
+            table.add_row(
+                str(row['slot']),
+                row['bank'],
+                f"{row['count']:04X}",
+                row['name']
+            )
+
+    @on(Button.Pressed, "#refresh-btn")
+    def action_refresh(self) -> None:
+        """Refresh the memory list"""
+        self.load_memories()
+
+    @on(Button.Pressed, "#back-btn")
+    def handle_back(self) -> None:
+        """Go back to main screen"""
+        self.app.pop_screen()
+
+
+class TrackSettingsScreen(Screen):
+    """Screen for editing track settings"""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Back"),
+    ]
+
+    CSS = """
+    TrackSettingsScreen {
+        layout: vertical;
+    }
+
+    #track-settings-container {
+        width: 100%;
+        height: 100%;
+        layout: vertical;
+        padding: 1 2;
+    }
+
+    #track-settings-title {
+        width: 100%;
+        text-style: bold;
+        color: $accent;
+        margin-bottom: 1;
+    }
+
+    #track-settings-scroll {
+        width: 100%;
+        height: 1fr;
+        border: solid $primary;
+    }
+
+    .settings-section {
+        width: 100%;
+        margin: 1 0;
+        padding: 1;
+        border: solid $primary-darken-2;
+    }
+
+    .section-title {
+        text-style: bold;
+        color: $accent;
+        margin-bottom: 1;
+    }
+
+    .setting-row {
+        height: auto;
+        width: 100%;
+        align: left middle;
+        margin: 0 0 1 0;
+    }
+
+    .setting-label {
+        width: 20;
+    }
+
+    .setting-value {
+        width: 10;
+        color: $text-muted;
+    }
+
+    #track-settings-buttons {
+        width: 100%;
+        height: auto;
+        align: center middle;
+        margin-top: 1;
+    }
+    """
+
+    def __init__(self, patch_slot: int, track_num: int, track, on_stage_callback):
+        super().__init__()
+        self.patch_slot = patch_slot
+        self.track_num = track_num
+        self.track = track
+        self.on_stage_callback = on_stage_callback
+        self.pending_changes = {}
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        with Container(id="track-settings-container"):
+            yield Label(f"Track {self.track_num} Settings - Patch {self.patch_slot:02d}", id="track-settings-title")
+
+            with VerticalScroll(id="track-settings-scroll"):
+                # Playback Settings Section
+                with Container(classes="settings-section"):
+                    yield Label("[bold]Playback Settings[/bold]", classes="section-title")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("Reverse:", classes="setting-label")
+                        yield Switch(value=bool(self.track.reverse), id="reverse")
+                        yield Label(f"({self.track.reverse})", classes="setting-value")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("One Shot:", classes="setting-label")
+                        yield Switch(value=bool(self.track.one_shot), id="one_shot")
+                        yield Label(f"({self.track.one_shot})", classes="setting-value")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("Playback FX:", classes="setting-label")
+                        yield Switch(value=bool(self.track.playback_fx), id="playback_fx")
+                        yield Label(f"({self.track.playback_fx})", classes="setting-value")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("Balance:", classes="setting-label")
+                        yield Label(str(self.track.balance), id="balance-display", classes="setting-value")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("Play Level:", classes="setting-label")
+                        yield Label(str(self.track.play_level), id="level-display", classes="setting-value")
+
+                # Track Type and Modes Section
+                with Container(classes="settings-section"):
+                    yield Label("[bold]Track Type & Modes[/bold]", classes="section-title")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("Track Type:", classes="setting-label")
+                        yield Switch(value=bool(self.track.track_type), id="track_type")
+                        yield Label(f"({'Single' if self.track.track_type else 'Multi'})", classes="setting-value")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("Tempo Sync:", classes="setting-label")
+                        yield Switch(value=bool(self.track.tempo_sync), id="tempo_sync")
+                        yield Label(f"({self.track.tempo_sync})", classes="setting-value")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("Playback Mode:", classes="setting-label")
+                        yield Label(str(self.track.playback_mode), id="playback-mode-display", classes="setting-value")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("Start Trigger:", classes="setting-label")
+                        yield Label(str(self.track.start_trigger_mode), id="start-trigger-display", classes="setting-value")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("Stop Mode:", classes="setting-label")
+                        yield Label(str(self.track.stop_mode), id="stop-mode-display", classes="setting-value")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("Overdub Mode:", classes="setting-label")
+                        yield Label(str(self.track.overdub_mode), id="overdub-mode-display", classes="setting-value")
+
+                # FX Assignments Section
+                with Container(classes="settings-section"):
+                    yield Label("[bold]FX Assignments[/bold]", classes="section-title")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("FX1 Assign:", classes="setting-label")
+                        yield Switch(value=bool(self.track.fx1_assign), id="fx1_assign")
+                        yield Label(f"({self.track.fx1_assign})", classes="setting-value")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("FX2 Assign:", classes="setting-label")
+                        yield Switch(value=bool(self.track.fx2_assign), id="fx2_assign")
+                        yield Label(f"({self.track.fx2_assign})", classes="setting-value")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("FX3 Assign:", classes="setting-label")
+                        yield Switch(value=bool(self.track.fx3_assign), id="fx3_assign")
+                        yield Label(f"({self.track.fx3_assign})", classes="setting-value")
+
+                # Timing Settings Section
+                with Container(classes="settings-section"):
+                    yield Label("[bold]Timing Settings[/bold]", classes="section-title")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("Rhythm Sync:", classes="setting-label")
+                        yield Switch(value=bool(self.track.rhythm_sync), id="rhythm_sync")
+                        yield Label(f"({self.track.rhythm_sync})", classes="setting-value")
+
+                    with Horizontal(classes="setting-row"):
+                        yield Label("Quantize:", classes="setting-label")
+                        yield Switch(value=bool(self.track.quantize), id="quantize")
+                        yield Label(f"({self.track.quantize})", classes="setting-value")
+
+            with Horizontal(id="track-settings-buttons"):
+                yield Button("Stage Changes", variant="primary", id="stage-btn")
+                yield Button("Back", variant="default", id="back-btn")
+        yield Footer()
+
+    @on(Switch.Changed)
+    def handle_switch_change(self, event: Switch.Changed) -> None:
+        """Track switch changes"""
+        switch_id = event.switch.id
+        value = 1 if event.value else 0
+        self.pending_changes[switch_id] = value
+
+    @on(Button.Pressed, "#stage-btn")
+    def handle_stage(self) -> None:
+        """Stage the track setting changes"""
+        if not self.pending_changes:
+            self.notify("No changes made", severity="warning")
+            return
+
+        # Create settings change data
+        settings_data = {
+            'patch_slot': self.patch_slot,
+            'track_num': self.track_num,
+            'changes': self.pending_changes.copy()
+        }
+
+        # Call the callback to stage changes
+        self.on_stage_callback(settings_data)
+
+        changes_count = len(self.pending_changes)
+        self.notify(f"Staged {changes_count} track setting{'s' if changes_count != 1 else ''}", severity="information")
+        self.dismiss(True)
+
+    @on(Button.Pressed, "#back-btn")
+    def handle_back(self) -> None:
+        """Go back without staging"""
+        self.dismiss(False)
+
+
+class MidiMonitorScreen(Screen):
+    """Screen showing incoming MIDI messages, refreshed in batches"""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Back"),
+        Binding("1", "toggle_filter('cc')", "CC"),
+        Binding("2", "toggle_filter('pc')", "PC"),
+        Binding("3", "toggle_filter('sysex')", "SysEx"),
+        Binding("4", "toggle_filter('clock')", "Clock"),
+        Binding("5", "cycle_clock_every", "Clock rate"),
+        Binding("c", "clear_log", "Clear"),
+    ]
+
+    CSS = """
+    MidiMonitorScreen {
+        layout: vertical;
+    }
+
+    #midi-container {
+        width: 100%;
+        height: 100%;
+        padding: 1 2;
+    }
+
+    #midi-title {
+        width: 100%;
+        text-style: bold;
+        color: $accent;
+    }
+
+    #midi-stats {
+        width: 100%;
+        color: $text-muted;
+        margin-bottom: 1;
+    }
+
+    #midi-log {
+        height: 1fr;
+        border: solid $primary;
+    }
+    """
+
+    REFRESH_INTERVAL = 0.1
+    MAX_LINES = 2000
+
+    def __init__(self, port_name: str = None, port=None):
+        from rc600_midi import MidiMonitor
+
+        super().__init__()
+        self.port_name = port_name
+        self.monitor = MidiMonitor(port)
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        with Container(id="midi-container"):
+            yield Label("MIDI Monitor", id="midi-title")
+            yield Label("", id="midi-stats")
+            yield RichLog(id="midi-log", max_lines=self.MAX_LINES, markup=False)
+        yield Footer()
+
+    def on_mount(self) -> None:
+        """Open the port and start the batched refresh timer"""
+        try:
+            self.monitor.open(self.port_name)
+        except Exception as e:
+            self.query_one("#midi-stats", Label).update(f"[red]✗ {e}[/]")
+            return
+        self.query_one("#midi-title", Label).update(f"MIDI Monitor - {self.monitor.port.name}")
+        self.set_interval(self.REFRESH_INTERVAL, self.refresh_log)
+
+    def on_unmount(self) -> None:
+        self.monitor.close()
+
+    def refresh_log(self) -> None:
+        """Write everything captured since the last refresh in one go"""
+        batch = self.monitor.drain(self.MAX_LINES)
+        if batch:
+            self.query_one("#midi-log", RichLog).write(self.monitor.format_batch(batch))
+
+        stats = self.monitor.stats()
+        self.query_one("#midi-stats", Label).update(
+            f"{stats['msg_rate']:.0f} msg/s | clock {stats['clock_rate']:.1f} ticks/s | "
+            f"received {stats['received']} | filtered {stats['filtered']} | dropped {stats['dropped']} | "
+            f"{self.monitor.filter}"
+        )
+
+    def action_toggle_filter(self, kind: str) -> None:
+        enabled = self.monitor.filter.toggle(kind)
+        self.notify(f"{kind.upper()} {'shown' if enabled else 'hidden'}", severity="information")
+
+    def action_cycle_clock_every(self) -> None:
+        every = self.monitor.filter.cycle_clock_every()
+        self.notify("Every clock tick" if every == 1 else f"1 of every {every} clock ticks", severity="information")
+
+    def action_clear_log(self) -> None:
+        self.query_one("#midi-log", RichLog).clear()
+
+
+class ClockScreen(Screen):
+    """Screen comparing incoming MIDI clock against the selected patch BPM"""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Back"),
+        Binding("c", "reset_stats", "Reset"),
+    ]
+
+    CSS = """
+    ClockScreen {
+        align: center middle;
+    }
+
+    #clock-container {
+        width: 90;
+        height: auto;
+        background: $surface;
+        border: thick $primary;
+        padding: 1 2;
+    }
+
+    #clock-title {
+        text-style: bold;
+        color: $accent;
+        margin-bottom: 1;
+    }
+    """
+
+    REFRESH_INTERVAL = 0.25
+
+    def __init__(self, reference_bpm: float = None, patch_label: str = "", port_name: str = None, port=None):
+        from rc600_midi import ClockAnalyzer, ClockMonitor
+
+        super().__init__()
+        self.port_name = port_name
+        self.patch_label = patch_label
+        self.monitor = ClockMonitor(port, ClockAnalyzer(reference_bpm=reference_bpm))
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        with Container(id="clock-container"):
+            yield Label("MIDI Clock", id="clock-title")
+            yield Static("Waiting for clock...", id="clock-stats")
+        yield Footer()
+
+    def on_mount(self) -> None:
+        """Start the analyzer thread and the display timer"""
+        try:
+            self.monitor.open(self.port_name)
+        except Exception as e:
+            self.query_one("#clock-stats", Static).update(f"[red]✗ {e}[/]")
+            return
+        title = f"MIDI Clock - {self.monitor.port.name}"
+        if self.patch_label:
+            title += f" - {self.patch_label}"
+        self.query_one("#clock-title", Label).update(title)
+        self.set_interval(self.REFRESH_INTERVAL, self.refresh_stats)
+
+    def on_unmount(self) -> None:
+        self.monitor.close()
+
+    def refresh_stats(self) -> None:
+        from rc600_midi import format_clock_stats
+
+        stats = self.monitor.analyzer.snapshot()
+        if stats['bpm'] is None:
+            self.query_one("#clock-stats", Static).update(format_clock_stats(stats))
+            return
+
+        text = f"[bold]BPM:[/bold] {stats['bpm']:.2f}\n"
+        if stats['reference_bpm']:
+            drift_color = "green" if abs(stats['drift_pct']) < 0.5 else "red"
+            text += f"[bold]Patch BPM:[/bold] {stats['reference_bpm']:.1f}  "
+            text += f"[{drift_color}]drift {stats['drift']:+.2f} ({stats['drift_pct']:+.2f}%)[/]\n"
+        text += (
+            f"[bold]Jitter:[/bold] p50 {stats['jitter_p50']:.0f}us  p95 {stats['jitter_p95']:.0f}us  "
+            f"p99 {stats['jitter_p99']:.0f}us  max {stats['jitter_max']:.0f}us\n"
+            f"[bold]Dropouts:[/bold] {stats['dropouts']} ({stats['missed_ticks']} ticks missed)\n"
+            f"[bold]Ticks:[/bold] {stats['ticks']} (window {stats['window']})"
+        )
+        self.query_one("#clock-stats", Static).update(text)
+
+    def action_reset_stats(self) -> None:
+        self.monitor.analyzer.reset()
+
+
+class StatsScreen(Screen):
+    """Screen showing hot-path timings and counters"""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Back"),
+        Binding("e", "toggle_stats", "Enable/Disable"),
+        Binding("c", "reset_stats", "Reset"),
+    ]
+
+    CSS = """
+    StatsScreen {
+        align: center middle;
+    }
+
+    #stats-container {
+        width: 80;
+        height: auto;
+        max-height: 100%;
+        background: $surface;
+        border: thick $primary;
+        padding: 1 2;
+    }
+
+    #stats-title {
+        text-style: bold;
+        color: $accent;
+        margin-bottom: 1;
+    }
+    """
+
+    def __init__(self, patch_cache=None):
+        super().__init__()
+        self.patch_cache = patch_cache
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        with Container(id="stats-container"):
+            yield Label("Performance Statistics", id="stats-title")
+            yield Static("", id="stats-report", markup=False)
+        yield Footer()
+
+    def on_mount(self) -> None:
+        self.refresh_report()
+        self.set_interval(1.0, self.refresh_report)
+
+    def refresh_report(self) -> None:
+        state = "enabled" if stats.enabled else "disabled"
+        self.query_one("#stats-title", Label).update(f"Performance Statistics ({state})")
+        report = stats.report()
+        if self.patch_cache is not None:
+            report = f"Patch cache: {self.patch_cache.describe()}\n\n{report}"
+        self.query_one("#stats-report", Static).update(report)
+
+    def action_toggle_stats(self) -> None:
+        stats.enable(not stats.enabled)
+        self.refresh_report()
+
+    def action_reset_stats(self) -> None:
+        stats.reset()
+        self.refresh_report()
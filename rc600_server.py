@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+RC-600 library server
+Serves the parsed patch library to the web UI over HTTP on the loopback
+interface and pushes slot-change events over WebSocket.
+
+    GET /api/library          all patches as one compact JSON payload (ETag)
+    GET /api/patches/<slot>   a single patch (ETag)
+    GET /api/rows             a page of lightweight rows:
+                              ?start=0&stop=20&fields=name,bpm,inputs
+    GET /ws                   WebSocket: {"type": "slot-changed", ...} events
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from urllib.parse import parse_qs, urlsplit
+
+from rc600_cache import PatchCache
+from rc600_index import FIELDS, SlotIndex
+from rc600_patch_manager import DATA_HELP, Memory, default_data_path, parse_slots
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8600
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+LOCAL_ORIGIN = re.compile(r'^https?://(localhost|127\.0\.0\.1|\[::1\])(:\d+)?$')
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+
+def track_to_dict(number, track):
+    """Track as the web UI's Track type (see web-ui/src/types/rc600.ts)"""
+    inputs = track.input_setup
+    return {
+        'number': number,
+        'reverse': track.reverse == 1,
+        'oneShot': track.one_shot == 1,
+        'playbackFX': str(track.playback_fx),
+        'balance': track.balance,
+        'playLevel': track.play_level,
+        'trackType': str(track.track_type),
+        'tempoSync': str(track.tempo_sync),
+        'playbackMode': str(track.playback_mode),
+        'startMode': str(track.start_trigger_mode),
+        'stopMode': str(track.stop_mode),
+        'overdubMode': str(track.overdub_mode),
+        'fx1': str(track.fx1_assign),
+        'fx2': str(track.fx2_assign),
+        'fx3': str(track.fx3_assign),
+        'rhythmSync': str(track.rhythm_sync),
+        'quantize': str(track.quantize),
+        'mic1': inputs['mic1'] == '1',
+        'mic2': inputs['mic2'] == '1',
+        'inst1L': inputs['inst1l'] == '1',
+        'inst1R': inputs['inst1r'] == '1',
+        'inst2L': inputs['inst2l'] == '1',
+        'inst2R': inputs['inst2r'] == '1',
+        'rhythm': inputs['rythm'] == '1',
+    }
+
+
+def patch_to_dict(m):
+    """Memory as the web UI's Patch type (see web-ui/src/types/rc600.ts)"""
+    result = {
+        'slot': m.slot,
+        'name': m.name,
+        'bank': m.seq,
+        'count': f'{m.count:X}',
+        'tracks': [track_to_dict(i, track) for i, track in enumerate(m.tracks, 1)],
+        'modified': False,
+    }
+    if m.bpm is not None:
+        result['bpm'] = m.bpm
+    return result
+
+
+def to_json(data):
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def make_etag(payload):
+    return '"' + hashlib.sha1(payload).hexdigest()[:20] + '"'
+
+
+def ws_accept_key(key):
+    digest = hashlib.sha1((key + WS_GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def ws_encode_frame(payload, opcode=0x1):
+    """Encode a single unmasked server-to-client frame"""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 1 << 16:
+        header += bytes([126]) + struct.pack('!H', length)
+    else:
+        header += bytes([127]) + struct.pack('!Q', length)
+    return header + payload
+
+
+def ws_read_frame(rfile):
+    """Read one client-to-server frame, returns (opcode, payload) or (None, b'') on EOF"""
+    head = rfile.read(2)
+    if len(head) < 2:
+        return None, b''
+    opcode = head[0] & 0x0F
+    masked = head[1] & 0x80
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', rfile.read(8))[0]
+    mask = rfile.read(4) if masked else None
+    payload = rfile.read(length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+class WebSocketClient:
+    def __init__(self, connection):
+        self.connection = connection
+        self.lock = threading.Lock()
+
+    def send(self, payload, opcode=0x1):
+        with self.lock:
+            self.connection.sendall(ws_encode_frame(payload, opcode))
+
+
+class Library:
+    """
+    The served library: parsed patches plus the serialized payload, kept
+    up to date by polling the bank files' mtimes. Only slots whose files
+    changed are re-parsed, and the JSON payload is rebuilt once per change.
+    """
+
+    def __init__(self, cwd, slots=range(100), workers=8):
+        self.cwd = cwd
+        self.slots = list(slots)
+        self.workers = workers
+        self.cache = PatchCache(cwd)
+        self.index = SlotIndex(cwd, self.slots)
+        self.file_state = {}  # slot -> stat signature of both bank files
+        self.patches = {}  # slot -> patch dict
+        self.errors = {}  # slot -> error message
+        self.payload = b''
+        self.etag = ''
+        self.lock = threading.Lock()
+        self.listeners = []
+
+    def stat_slot(self, slot):
+        signature = []
+        for bank in 'AB':
+            try:
+                st = os.stat(os.path.join(self.cwd, f'MEMORY{slot:03}{bank}.RC0'))
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def load_slot(self, slot):
+        self.cache.invalidate(slot)
+        try:
+            return slot, patch_to_dict(self.cache.get(slot, validate=False)), None
+        except Exception as e:
+            return slot, None, str(e)
+
+    def refresh(self):
+        """Re-parse slots whose files changed; returns the list of changed slots"""
+        changed = []
+        for slot in self.slots:
+            state = self.stat_slot(slot)
+            if self.file_state.get(slot) != state:
+                self.file_state[slot] = state
+                changed.append(slot)
+        if not changed:
+            return []
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(self.load_slot, changed))
+
+        with self.lock:
+            for slot, patch, error in results:
+                if patch is not None:
+                    self.patches[slot] = patch
+                    self.errors.pop(slot, None)
+                else:
+                    self.patches.pop(slot, None)
+                    self.errors[slot] = error
+            self.payload = to_json({
+                'path': os.path.abspath(self.cwd),
+                'patches': [self.patches[slot] for slot in sorted(self.patches)],
+                'errors': {str(slot): error for slot, error in sorted(self.errors.items())},
+            })
+            self.etag = make_etag(self.payload)
+        return changed
+
+    def patch(self, slot):
+        """Return (payload, etag) for one slot, or None if it isn't available"""
+        with self.lock:
+            patch = self.patches.get(slot)
+        if patch is None:
+            return None
+        payload = to_json(patch)
+        return payload, make_etag(payload)
+
+    def watch(self, interval=1.0, stop_event=None):
+        """Poll for changes until stop_event is set, notifying listeners per changed slot"""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.wait(interval):
+            changed = self.refresh()
+            for slot in changed:
+                with self.lock:
+                    patch = self.patches.get(slot)
+                    event = {
+                        'type': 'slot-changed',
+                        'slot': slot,
+                        'bank': patch['bank'] if patch else None,
+                        'count': patch['count'] if patch else None,
+                        'error': self.errors.get(slot),
+                        'etag': self.etag,
+                    }
+                for listener in list(self.listeners):
+                    listener(event)
+
+
+class LibraryRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'RC600Library/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def host_allowed(self):
+        # A DNS-rebinding page reaches the server under its own host name and
+        # sends no Origin on same-origin GETs, so the Host header is checked
+        return self.headers.get('Host', '').lower() in self.server.allowed_hosts
+
+    def origin_allowed(self, origin):
+        return bool(LOCAL_ORIGIN.match(origin)) or origin in self.server.allowed_origins
+
+    def cors_headers(self):
+        origin = self.headers.get('Origin')
+        if origin and self.origin_allowed(origin):
+            self.send_header('Access-Control-Allow-Origin', origin)
+            self.send_header('Vary', 'Origin')
+
+    def send_json(self, payload, etag):
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.cors_headers()
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('ETag', etag)
+        self.cors_headers()
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_error_json(self, status, message):
+        payload = to_json({'error': message})
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.cors_headers()
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if not self.host_allowed():
+            self.send_error_json(403, f"Host {self.headers.get('Host')} not allowed")
+            return
+        library = self.server.library
+        path, _, query = self.path.partition('?')
+
+        if path == '/api/library':
+            with library.lock:
+                payload, etag = library.payload, library.etag
+            self.send_json(payload, etag)
+            return
+
+        if path == '/api/rows':
+            self.handle_rows(parse_qs(query))
+            return
+
+        match = re.match(r'^/api/patches/(\d+)$', path)
+        if match:
+            result = library.patch(int(match.group(1)))
+            if result is None:
+                self.send_error_json(404, f'Slot {match.group(1)} not available')
+            else:
+                self.send_json(*result)
+            return
+
+        if path == '/ws' and self.headers.get('Upgrade', '').lower() == 'websocket':
+            self.handle_websocket()
+            return
+
+        self.send_error_json(404, 'Not found')
+
+    def handle_rows(self, params):
+        try:
+            start = int(params.get('start', ['0'])[0])
+            stop = int(params.get('stop', [str(len(self.server.library.index))])[0])
+        except ValueError:
+            self.send_error_json(400, 'start and stop must be integers')
+            return
+        fields = tuple(params.get('fields', ['name'])[0].split(','))
+        unknown = [field for field in fields if field not in FIELDS]
+        if unknown:
+            self.send_error_json(400, f"Unknown fields: {', '.join(unknown)}")
+            return
+
+        rows = self.server.library.index.rows(start, stop, fields)
+        payload = to_json({'start': start, 'stop': stop, 'total': len(self.server.library.index), 'rows': rows})
+        self.send_json(payload, make_etag(payload))
+
+    def handle_websocket(self):
+        # Browsers send Origin on every WebSocket handshake, and CORS doesn't
+        # cover WebSockets: any page could subscribe unless it is checked here
+        origin = self.headers.get('Origin')
+        if origin and not self.origin_allowed(origin):
+            self.send_error_json(403, f'Origin {origin} not allowed')
+            return
+        key = self.headers.get('Sec-WebSocket-Key')
+        if not key:
+            self.send_error_json(400, 'Missing Sec-WebSocket-Key')
+            return
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', ws_accept_key(key))
+        self.end_headers()
+        self.wfile.flush()
+
+        client = WebSocketClient(self.connection)
+        self.server.add_client(client)
+        try:
+            while True:
+                opcode, payload = ws_read_frame(self.rfile)
+                if opcode is None or opcode == 0x8:
+                    break
+                if opcode == 0x9:
+                    client.send(payload, 0xA)
+        except OSError:
+            pass
+        finally:
+            self.server.remove_client(client)
+            try:
+                client.send(b'', 0x8)
+            except OSError:
+                pass
+        self.close_connection = True
+
+
+class LibraryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, library, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False, allowed_origins=()):
+        super().__init__((host, port), LibraryRequestHandler)
+        self.library = library
+        self.verbose = verbose
+        self.allowed_origins = set(allowed_origins)  # besides localhost
+        hosts = {*LOCAL_HOSTS, host, *(urlsplit(origin).hostname for origin in self.allowed_origins)}
+        self.allowed_hosts = {f"{f'[{name}]' if ':' in name else name}:{self.server_address[1]}".lower()
+                              for name in hosts if name}
+        self.clients = set()
+        self.clients_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        library.listeners.append(self.broadcast)
+
+    def add_client(self, client):
+        with self.clients_lock:
+            self.clients.add(client)
+
+    def remove_client(self, client):
+        with self.clients_lock:
+            self.clients.discard(client)
+
+    def broadcast(self, event):
+        payload = to_json(event)
+        with self.clients_lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.send(payload)
+            except OSError:
+                self.remove_client(client)
+
+    def start_watcher(self, interval=1.0):
+        thread = threading.Thread(
+            target=self.library.watch, args=(interval, self.stop_event),
+            name='rc600-library-watch', daemon=True
+        )
+        thread.start()
+        return thread
+
+    def server_close(self):
+        self.stop_event.set()
+        super().server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the RC-600 patch library to the web UI")
+    parser.add_argument('--data', help=DATA_HELP)
+    parser.add_argument('--host', default=DEFAULT_HOST, help="bind address (loopback only by default)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--slots', type=parse_slots, default=range(100), help="slot range, e.g. 0-99")
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between change scans")
+    parser.add_argument('--allow-origin', action='append', default=[], metavar='ORIGIN',
+                        help="also accept requests from this origin, e.g. http://rc600.lan:5173 (repeatable)")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args(argv)
+
+    data_path = args.data or default_data_path()
+    Memory.cwd = data_path
+
+    library = Library(data_path, args.slots)
+    start = time.perf_counter()
+    library.refresh()
+    print(f"Loaded {len(library.patches)} patches from {data_path} in {time.perf_counter() - start:.2f}s"
+          f" ({len(library.errors)} errors)")
+
+    server = LibraryServer(library, args.host, args.port, args.verbose, args.allow_origin)
+    server.start_watcher(args.interval)
+    print(f"Serving on http://{args.host}:{args.port}/api/library (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""
+RC-600 card sessions
+Mirrors the active bank of every slot into a local working copy (tmpfs
+where there is one) in one bulk read, so edits run at local speed instead
+of over USB mass storage. The working copy is an ordinary DATA folder:
+the CLI, the TUI and scripts work on it unchanged. flush() then writes
+only the slots whose content changed back to the card, in slot order,
+with their slots locked and after checking that none of them was saved
+on the card since the session opened (StaleBankError otherwise, with
+nothing written).
+
+Only the patch banks are mirrored; recorded loops stay on the card.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import rc600_stats as stats
+from rc600_patch_manager import DATA_HELP, StaleBankError, active_bank, default_data_path
+from rc600_plan import Plan, content_hash, read_active
+
+STATE_FILE = 'session.json'
+SHM_DIR = '/dev/shm'
+BANK_FILE = re.compile(r'MEMORY(\d{3})[AB]\.RC0$')
+
+
+def default_work_root():
+    """tmpfs if the system has one, else the temporary directory"""
+    return SHM_DIR if os.access(SHM_DIR, os.W_OK) else tempfile.gettempdir()
+
+
+class Session:
+    """
+    A working copy of a card's DATA folder. `path` is the working DATA
+    folder; `baseline` has the card's (bank, count, content hash) per slot
+    at open (or at the last flush). The state is kept in the working copy,
+    so a session can be reopened by another process with Session.load().
+    """
+
+    def __init__(self, card_path, work_dir):
+        self.card_path = os.path.abspath(card_path)
+        self.work_dir = work_dir
+        self.path = os.path.join(work_dir, 'DATA')
+        self.baseline = {}  # slot -> (bank, count, hash)
+
+    @classmethod
+    def open(cls, card_path, slots=range(100), work_root=None, workers=4):
+        """Read the active banks of `slots` from the card into a new working copy"""
+        session = cls(card_path, tempfile.mkdtemp(prefix='rc600-session-', dir=work_root or default_work_root()))
+        os.makedirs(session.path)
+
+        def read(slot):
+            try:
+                return slot, read_active(session.card_path, slot)
+            except (OSError, ValueError):
+                return slot, None  # empty or unreadable: only written on flush if the session creates it
+
+        with stats.timer('session.open'):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for slot, active in executor.map(read, slots):
+                    if active is None:
+                        continue
+                    content, bank, count = active
+                    with open(os.path.join(session.path, f'MEMORY{slot:03}{bank}.RC0'), 'wb') as f:
+                        f.write(content)
+                    session.baseline[slot] = (bank, count, content_hash(content))
+                    stats.count('session.read', len(content))
+        session.save_state()
+        return session
+
+    @classmethod
+    def load(cls, work_dir):
+        with open(os.path.join(work_dir, STATE_FILE), encoding='utf-8') as f:
+            state = json.load(f)
+        session = cls(state['card'], work_dir)
+        session.baseline = {int(slot): tuple(entry) for slot, entry in state['baseline'].items()}
+        return session
+
+    def save_state(self):
+        tmp_file = os.path.join(self.work_dir, f'{STATE_FILE}.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'card': self.card_path, 'baseline': self.baseline}, f)
+        os.replace(tmp_file, os.path.join(self.work_dir, STATE_FILE))
+
+    def changes(self):
+        """{slot: active bank bytes} of the working copy's slots whose content differs from the baseline"""
+        changed = {}
+        slots = sorted({int(match.group(1)) for match in map(BANK_FILE.match, os.listdir(self.path)) if match})
+        for slot in slots:
+            try:
+                content, _, _ = read_active(self.path, slot)
+            except (OSError, ValueError):
+                continue
+            baseline = self.baseline.get(slot)
+            if baseline is None or content_hash(content) != baseline[2]:
+                changed[slot] = content
+        return changed
+
+    def unflushed(self):
+        """
+        changes() without the slots whose content the card already holds,
+        e.g. written by a flush that failed partway; their baseline moves
+        to the card's bank and count
+        """
+        changed = {}
+        for slot, content in self.changes().items():
+            try:
+                card_content, bank, count = read_active(self.card_path, slot)
+            except (OSError, ValueError):
+                card_content = None
+            digest = content_hash(content)
+            if card_content is not None and content_hash(card_content) == digest:
+                self.baseline[slot] = (bank, count, digest)
+            else:
+                changed[slot] = content
+        return changed
+
+    def plan(self):
+        """Plan writing the changed slots to the card against the baseline"""
+        plan = Plan(self.card_path)
+        for slot, content in self.unflushed().items():
+            bank, count, digest = self.baseline.get(slot, (None, None, None))
+            plan.current[slot] = (digest, bank, count)
+            plan.add(slot, content, f"session ({len(content)} bytes)")
+        return plan
+
+    def conflicts(self):
+        """Changed slots that were saved on the card since the session read them"""
+        return [slot for slot in self.unflushed()
+                if active_bank(self.card_path, slot) != self.baseline.get(slot, (None, None, None))[:2]]
+
+    def flush(self, dry_run=False):
+        """
+        Write the changed slots to the card in one batch. Returns a summary
+        dict with the Plan, 'slots' written, 'bytes' and 'seconds'.
+        """
+        plan = self.plan()
+        start = time.perf_counter()
+
+        def written(entry):
+            # Per slot, so a flush that fails partway can be retried from where it stopped
+            bank = os.path.basename(entry['file'])[9]
+            self.baseline[entry['slot']] = (bank, entry['count'], content_hash(entry['content']))
+            self.save_state()
+
+        if not dry_run:
+            try:
+                with stats.timer('session.flush'):
+                    plan.execute(written)
+            finally:
+                self.save_state()
+        writes = plan.writes
+        return {
+            'plan': plan,
+            'slots': [entry['slot'] for entry in writes],
+            'bytes': sum(len(entry['content']) for entry in writes),
+            'seconds': time.perf_counter() - start,
+        }
+
+    def discard(self):
+        """Remove the working copy"""
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def format_summary(summary, dry_run=False):
+    written = "would write" if dry_run else "wrote"
+    rate = summary['bytes'] / summary['seconds'] / 2**10 if summary['seconds'] and not dry_run else None
+    return (f"Flush {written} {len(summary['slots'])} slots, {summary['bytes']} bytes"
+            + (f" in {summary['seconds']:.2f}s ({rate:.0f} KB/s)" if rate else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Work on a local copy of the card and flush the changes in one batch")
+    commands = parser.add_subparsers(dest='command', required=True)
+    open_parser = commands.add_parser('open', help="copy the card's active banks to a working DATA folder")
+    open_parser.add_argument('--data', help=DATA_HELP)
+    open_parser.add_argument('--work', help=f"where to create the working copy (default: {SHM_DIR} or the temp dir)")
+    open_parser.add_argument('--workers', type=int, default=4)
+    for name, help_text in (('status', "list the slots changed in a session"),
+                            ('flush', "write the changed slots to the card"),
+                            ('discard', "remove a session's working copy")):
+        command_parser = commands.add_parser(name, help=help_text)
+        command_parser.add_argument('session', help="session folder printed by open")
+    commands.choices['flush'].add_argument('--dry-run', action='store_true', help="print the planned writes only")
+    args = parser.parse_args(argv)
+
+    if args.command == 'open':
+        data_path = args.data or default_data_path()
+        start = time.perf_counter()
+        session = Session.open(data_path, work_root=args.work, workers=args.workers)
+        print(f"Read {len(session.baseline)} slots from {session.card_path} in {time.perf_counter() - start:.2f}s")
+        print(f"Session: {session.work_dir}")
+        print(f"Work on: {session.path}  (e.g. python3 rc600_tui.py --data {session.path})")
+        return 0
+
+    session = Session.load(args.session)
+    if args.command == 'status':
+        changes = session.changes()
+        for slot, content in changes.items():
+            print(f"  {slot:03} changed ({len(content)} bytes)")
+        print(f"{len(changes)} slots changed since {session.card_path} was read")
+    elif args.command == 'flush':
+        try:
+            summary = session.flush(args.dry_run)
+        except StaleBankError as e:
+            print(e)
+            print(f"Changed on the card since the session was opened: "
+                  f"{', '.join(f'{slot:03}' for slot in session.conflicts())}")
+            print(f"Nothing was written; the session is kept in {session.work_dir}")
+            return 1
+        print(summary['plan'])
+        print(format_summary(summary, args.dry_run))
+    elif args.command == 'discard':
+        session.discard()
+        print(f"Removed {session.work_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
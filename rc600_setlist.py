@@ -0,0 +1,64 @@
+"""
+RC-600 setlist builder
+Relocates patches to new slots by copying the bytes of the active bank.
+Only the NAME characters, the slot ids and the count are rewritten, so
+no XML is parsed or serialized, and destinations that already hold the
+requested patch and name are not written at all.
+"""
+
+import csv
+import re
+
+import rc600_stats as stats
+from rc600_lock import CardLock
+from rc600_names import set_name
+from rc600_plan import Plan, read_active
+
+SLOT_ID = re.compile(rb'(<(?:mem|ifx|tfx) id=")(\d+)(")')
+
+
+def relocate(content, source, dest, name=None):
+    """
+    Return the bytes of a bank file moved from slot `source` to slot `dest`:
+    slot ids shift by the same offset and the name is optionally rewritten.
+    """
+    with stats.timer('setlist.patch'):
+        if source != dest:
+            content = SLOT_ID.sub(lambda m: b'%s%d%s' % (m.group(1), int(m.group(2)) - source + dest, m.group(3)),
+                                  content)
+        if name is not None:
+            content = set_name(content, name)
+        return content
+
+
+def plan_setlist(entries, path=None, start=1):
+    """
+    Plan copying patches into consecutive slots starting at `start`.
+    `entries` is a list of (source slot, name or None). Everything is read
+    from the current card state, so a setlist may reuse slots it overwrites.
+    """
+    plan = Plan(path)
+    sources = [read_active(plan.path, source)[0] for source, _ in entries]
+    for dest, ((source, name), content) in enumerate(zip(entries, sources), start):
+        description = f"from {source:03}" + (f" as '{name}'" if name is not None else '')
+        plan.add(dest, relocate(content, source, dest, name), description)
+    return plan
+
+
+def build_setlist(entries, path=None, start=1, dry_run=False):
+    """
+    Plan and write a setlist, holding the destination slots from planning
+    to writing; returns the Plan (nothing is written with dry_run)
+    """
+    dests = range(start, start + len(entries)) if not dry_run else ()
+    with CardLock(path, dests):
+        plan = plan_setlist(entries, path, start)
+        if not dry_run:
+            plan.execute()
+    return plan
+
+
+def read_setlist_csv(csv_file):
+    """Read (source slot, name) entries from a setlist CSV; an empty ShortName keeps the name"""
+    with open(csv_file, 'r') as f:
+        return [(int(row['Banco']), row.get('ShortName') or None) for row in csv.DictReader(f)]
@@ -0,0 +1,119 @@
+"""
+RC-600 instrumentation
+Timers and counters around the hot paths (bank resolution, file I/O,
+regex rewrite, XML parse/serialize, tree mutation, fsync).
+
+Collection is off by default; while disabled, timer() hands back a shared
+no-op context manager and count() returns immediately, so the
+instrumentation can stay in place in production.
+"""
+
+import threading
+import time
+
+enabled = False
+
+_lock = threading.Lock()
+_timings = {}  # name -> [calls, total_ns, max_ns]
+_counters = {}  # name -> value
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """Context manager timing a block under `name`"""
+    if not enabled:
+        return _NULL_TIMER
+    return _Timer(name)
+
+
+def record(name, elapsed_ns):
+    with _lock:
+        entry = _timings.get(name)
+        if entry is None:
+            _timings[name] = [1, elapsed_ns, elapsed_ns]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed_ns
+            if elapsed_ns > entry[2]:
+                entry[2] = elapsed_ns
+
+
+def count(name, value=1):
+    """Add `value` to the counter `name`"""
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def reset():
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+
+
+def snapshot():
+    """Return {'timings': {name: {...}}, 'counters': {name: value}}"""
+    with _lock:
+        timings = {name: list(entry) for name, entry in _timings.items()}
+        counters = dict(_counters)
+    return {
+        'timings': {
+            name: {
+                'calls': calls,
+                'total_ms': total / 1e6,
+                'mean_ms': total / calls / 1e6,
+                'max_ms': longest / 1e6,
+            }
+            for name, (calls, total, longest) in timings.items()
+        },
+        'counters': counters,
+    }
+
+
+def report():
+    """Format the current statistics as a text table, slowest operations first"""
+    data = snapshot()
+    if not data['timings'] and not data['counters']:
+        return "No statistics collected" + ("" if enabled else " (instrumentation disabled)")
+
+    lines = [f"{'operation':<16} {'calls':>8} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+    for name, t in sorted(data['timings'].items(), key=lambda item: -item[1]['total_ms']):
+        lines.append(f"{name:<16} {t['calls']:>8} {t['total_ms']:>10.1f} {t['mean_ms']:>9.3f} {t['max_ms']:>9.3f}")
+    if data['counters']:
+        lines.append("")
+        for name, value in sorted(data['counters'].items()):
+            lines.append(f"{name:<16} {value:>8}")
+    return '\n'.join(lines)
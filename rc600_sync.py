@@ -0,0 +1,215 @@
+"""
+RC-600 card sync
+Pushes a DATA folder (e.g. a master copy kept in git) to one or more
+cards, writing only the slots whose content differs. Each slot's active
+bank is hashed on both sides (ignoring the count line) on a thread pool;
+the hashes are cached by the size and mtime of both bank files, so an
+unchanged slot costs two stat calls instead of a read. Differing slots are
+written through a Plan to the destination's alternate bank with its
+count + 1, slots locked and re-checked like any other save.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import rc600_stats as stats
+from rc600_index import CACHE_DIR
+from rc600_names import decode_block, find_block
+from rc600_patch_manager import StaleBankError, parse_slots
+from rc600_plan import Plan, content_hash, read_active
+
+# FAT keeps mtimes to 2 seconds: a file modified this close to when it was
+# hashed could change again without its mtime moving, so it isn't trusted
+MTIME_RESOLUTION = 2 * 10**9
+
+
+def bank_stats(path, slot):
+    """[(mtime_ns, size) or None] for banks A and B of a slot"""
+    result = []
+    for bank in 'AB':
+        try:
+            st = os.stat(os.path.join(path, f'MEMORY{slot:03}{bank}.RC0'))
+            result.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            result.append(None)
+    return result
+
+
+class HashCache:
+    """
+    Content hashes of a DATA folder's active banks keyed by slot, persisted
+    outside the card. Entries hold 'stats' (both banks), 'bank', 'count',
+    'hash' and 'checked' (when it was hashed, in ns), or None for a slot
+    without a readable bank.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hashed = 0  # slots read and hashed by the last scan
+
+    def cache_file(self):
+        key = hashlib.sha1(self.path.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(CACHE_DIR, f'sync-{key}.json')
+
+    def load(self):
+        try:
+            with open(self.cache_file(), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get('path') != self.path:
+            return 0
+        self.entries = {int(slot): entry for slot, entry in data.get('entries', {}).items()}
+        return len(self.entries)
+
+    def save(self):
+        cache_file = self.cache_file()
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'path': self.path, 'entries': self.entries}, f, separators=(',', ':'))
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass
+
+    def _fresh(self, entry, current):
+        if entry is None or [tuple(s) if s else None for s in entry['stats']] != current:
+            return False
+        return all(s is None or s[0] < entry['checked'] - MTIME_RESOLUTION for s in current)
+
+    def entry(self, slot):
+        """The slot's entry, hashing the active bank only if a bank file changed"""
+        current = bank_stats(self.path, slot)
+        with self.lock:
+            entry = self.entries.get(slot)
+        if entry is not None and self._fresh(entry, current):
+            stats.count('sync.cached')
+            return entry
+
+        checked = time.time_ns()
+        try:
+            with stats.timer('sync.hash'):
+                content, bank, count = read_active(self.path, slot)
+            entry = {'stats': current, 'bank': bank, 'count': count, 'hash': content_hash(content), 'checked': checked}
+        except (OSError, ValueError):
+            entry = None
+        with self.lock:
+            self.entries[slot] = entry
+            self.hashed += 1
+        return entry
+
+    def scan(self, slots=range(100), workers=8):
+        """{slot: entry or None} for the given slots"""
+        self.hashed = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(slots, executor.map(self.entry, slots)))
+
+    def invalidate(self, slots):
+        with self.lock:
+            for slot in slots:
+                self.entries.pop(slot, None)
+
+
+def slot_name(content):
+    try:
+        return decode_block(find_block(content).group(0))
+    except ValueError:
+        return '?'
+
+
+def plan_sync(source, dest, source_hashes, dest_hashes):
+    """
+    Plan writing the source's differing slots to dest. Returns the Plan and
+    the source slots that have no readable bank (left alone on dest).
+    """
+    plan = Plan(dest.path)
+    missing = []
+    for slot, entry in source_hashes.items():
+        theirs = dest_hashes.get(slot)
+        if entry is None:
+            missing.append(slot)
+            continue
+        if theirs is not None and theirs['hash'] == entry['hash']:
+            continue
+        content, _, _ = read_active(source.path, slot)
+        description = f"'{slot_name(content)}'"
+        if theirs is not None:
+            plan.current[slot] = (theirs['hash'], theirs['bank'], theirs['count'])
+            old_content, _, _ = read_active(dest.path, slot)
+            if slot_name(old_content) != slot_name(content):
+                description += f" (was '{slot_name(old_content)}')"
+            else:
+                description += " (settings changed)"
+        else:
+            plan.current[slot] = (None, None, None)
+            description += " (new on the card)"
+        plan.add(slot, content, description)
+    return plan, missing
+
+
+def sync(source_path, dest_path, slots=range(100), workers=8, dry_run=False, source=None):
+    """
+    Make dest's slots hold the same content as the source's. `source` is a
+    scanned HashCache to reuse across several destinations. Returns a dict
+    with 'plan', 'missing', 'hashed' (slots read on dest) and 'seconds'.
+    """
+    start = time.perf_counter()
+    if source is None:
+        source = HashCache(source_path)
+        source.load()
+    source_hashes = source.scan(slots, workers)
+    source.save()
+
+    dest = HashCache(dest_path)
+    dest.load()
+    dest_hashes = dest.scan(slots, workers)
+
+    plan, missing = plan_sync(source, dest, source_hashes, dest_hashes)
+    if not dry_run:
+        with stats.timer('sync.write'):
+            plan.execute()
+        dest.invalidate(plan.slots)
+    dest.save()
+    return {'plan': plan, 'missing': missing, 'hashed': dest.hashed, 'seconds': time.perf_counter() - start}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the slots that differ from a DATA folder to one or more cards")
+    parser.add_argument('source', help="DATA folder to copy from (e.g. the master copy)")
+    parser.add_argument('dest', nargs='+', help="card DATA folders to update")
+    parser.add_argument('--slots', type=parse_slots, default=range(100), help="slot range, e.g. 0-99")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--dry-run', action='store_true', help="print what would change without writing")
+    args = parser.parse_args(argv)
+
+    source = HashCache(args.source)
+    source.load()
+    status = 0
+    for dest_path in args.dest:
+        print(f"{args.source} -> {dest_path}")
+        try:
+            result = sync(args.source, dest_path, args.slots, args.workers, args.dry_run, source)
+        except StaleBankError as e:
+            print(f"  {e}; nothing written to {dest_path}")
+            status = 1
+            continue
+        print(result['plan'])
+        if result['missing']:
+            print(f"  no readable bank in the source for {', '.join(f'{slot:03}' for slot in result['missing'])}")
+        written = sum(len(entry['content']) for entry in result['plan'].writes)
+        print(f"{'Would write' if args.dry_run else 'Wrote'} {len(result['plan'].writes)} slots ({written} bytes), "
+              f"hashed {result['hashed']} slots on the card, in {result['seconds']:.2f}s")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
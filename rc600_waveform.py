@@ -0,0 +1,187 @@
+"""
+RC-600 loop waveforms
+Compact min/max overviews of the track WAVs, decimated with NumPy one
+column at a time, rendered with block characters and cached on disk
+under a hash of the file's audio data, so each loop is computed once
+(copies of a loop in other slots share it).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import rc600_stats as stats
+from rc600_audio import TRACKS, WaveIndex, read_header, track_file
+from rc600_index import CACHE_DIR
+from rc600_loudness import decode, np, require_numpy
+from rc600_patch_manager import DATA_HELP, default_data_path, parse_slots
+
+WIDTH = 24
+BLOCKS = ' ▁▂▃▄▅▆▇█'
+WAVEFORM_DIR = os.path.join(CACHE_DIR, 'waveforms')
+
+HASH_BLOCK = 2**20
+
+
+def fingerprint(file, header):
+    """
+    Hash of a WAV's format and all of its audio data, so an overdub
+    anywhere in a loop gets a new thumbnail. A WaveIndex entry (replaced
+    whenever the file's mtime or size changes) keeps the hash in 'hash',
+    so an unchanged loop is only read once.
+    """
+    if 'hash' in header:
+        return header['hash']
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((header['format'], header['channels'], header['sample_rate'], header['bits'],
+                        header['data_size'])).encode('ascii'))
+    with stats.timer('audio.hash'):
+        with open(file, 'rb') as f:
+            f.seek(header['data_offset'])
+            remaining = header['data_size']
+            while remaining > 0:
+                block = f.read(min(HASH_BLOCK, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                remaining -= len(block)
+    key = digest.hexdigest()
+    if 'mtime' in header:
+        header['hash'] = key
+    return key
+
+
+def compute_peaks(file, header=None, width=WIDTH):
+    """
+    (mins, maxs) per column over all channels, reading one column of
+    frames at a time from a memory map. Empty columns are 0.
+    """
+    require_numpy()
+    header = header or read_header(file)
+    frames, block_align = header['frames'], header['block_align']
+    mins, maxs = [0.0] * width, [0.0] * width
+    if not frames:
+        return mins, maxs
+
+    with stats.timer('audio.waveform'):
+        data = np.memmap(file, dtype=np.uint8, mode='r', offset=header['data_offset'],
+                         shape=(frames * block_align,))
+        bounds = np.linspace(0, frames, width + 1).astype(int)
+        for column, (start, stop) in enumerate(zip(bounds, bounds[1:])):
+            if stop > start:
+                samples = decode(data[start * block_align:stop * block_align], header)
+                mins[column], maxs[column] = float(samples.min()), float(samples.max())
+        del data
+    return mins, maxs
+
+
+def render(mins, maxs):
+    """One line of block characters, one per column, sized by the column's peak"""
+    top = len(BLOCKS) - 1
+    return ''.join(BLOCKS[min(top, int(round(max(-low, high, 0.0) * top)))] for low, high in zip(mins, maxs))
+
+
+def cache_file(key):
+    return os.path.join(WAVEFORM_DIR, f'{key}.json')
+
+
+def load_cached(key):
+    try:
+        with open(cache_file(key), encoding='utf-8') as f:
+            data = json.load(f)
+        return data['min'], data['max']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def store(key, mins, maxs):
+    file = cache_file(key)
+    try:
+        os.makedirs(WAVEFORM_DIR, exist_ok=True)
+        tmp_file = f'{file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'min': [round(value, 4) for value in mins], 'max': [round(value, 4) for value in maxs]}, f)
+        os.replace(tmp_file, file)
+    except OSError:
+        pass
+
+
+def waveform(file, header=None, width=WIDTH):
+    """Rendered waveform of a WAV, computed only if it isn't cached yet"""
+    header = header or read_header(file)
+    key = f'{fingerprint(file, header)}-{width}'
+    peaks = load_cached(key)
+    if peaks is None:
+        stats.count('waveform.computed')
+        peaks = compute_peaks(file, header, width)
+        store(key, *peaks)
+    return render(*peaks)
+
+
+def slot_waveforms(index, slot, width=WIDTH):
+    """{track: rendered waveform} for the tracks of a slot with audio (from a scanned WaveIndex)"""
+    result = {}
+    for track, entry in zip(TRACKS, index.tracks(slot)):
+        if entry is not None:
+            try:
+                result[track] = waveform(track_file(index.path, slot, track), entry, width)
+            except (OSError, ValueError):
+                pass
+    return result
+
+
+def generate(path=None, slots=range(100), wave_path=None, workers=4, width=WIDTH):
+    """
+    Make sure every loop of the given slots has a cached waveform,
+    computing the missing ones in parallel. Returns {(slot, track): rendered}.
+    """
+    index = WaveIndex(path, wave_path)
+    index.load()
+    index.scan(slots)
+    index.save()
+    slots = set(slots)
+    keys = sorted(key for key, entry in index.entries.items() if key[0] in slots and 'error' not in entry)
+
+    def run(key):
+        try:
+            return key, waveform(track_file(index.path, *key), index.entries[key], width)
+        except (OSError, ValueError):
+            return key, None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        waveforms = {key: rendered for key, rendered in executor.map(run, keys) if rendered is not None}
+    index.save()  # with the audio hashes
+    return waveforms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute and show waveform overviews of the recorded loops")
+    parser.add_argument('--data', help=DATA_HELP)
+    parser.add_argument('--wave', help="WAVE folder (default: next to the DATA folder)")
+    parser.add_argument('--slots', type=parse_slots, default=range(100), help="slot range, e.g. 0-99")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--width', type=int, default=WIDTH)
+    args = parser.parse_args(argv)
+
+    data_path = args.data or default_data_path()
+    try:
+        require_numpy()
+    except RuntimeError as e:
+        print(e)
+        return 1
+
+    start = time.perf_counter()
+    waveforms = generate(data_path, args.slots, args.wave, args.workers, args.width)
+    elapsed = time.perf_counter() - start
+    for (slot, track), rendered in waveforms.items():
+        print(f"{slot:03} track {track} |{rendered}|")
+    print(f"{len(waveforms)} waveforms in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,7 @@
 import { useRC600Store } from '../stores/useRC600Store';
 
 export function DirectoryPicker() {
-  const { directoryHandle, dataPath, setDirectoryHandle, setDataPath, loadPatches } = useRC600Store();
+  const { directoryHandle, dataPath, useServer, setDirectoryHandle, setDataPath, setUseServer, loadPatches } = useRC600Store();
 
   // Check if File System Access API is supported
   const isSupported = 'showDirectoryPicker' in window;
@@ -74,6 +74,10 @@ export function DirectoryPicker() {
           >
             Select Directory
           </button>
+          <label className="flex items-center justify-center gap-2 mt-3 text-sm text-gray-600 dark:text-gray-300">
+            <input type="checkbox" checked={useServer} onChange={(e) => setUseServer(e.target.checked)} />
+            Load through the local library server (<code>rc600_server.py</code> on the same folder)
+          </label>
         </div>
       ) : (
         <div className="flex items-center justify-between">
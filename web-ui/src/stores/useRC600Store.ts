@@ -1,12 +1,22 @@
 import { create } from "zustand";
 import { Patch, CopyOperation } from "../types/rc600";
-import { loadPatch } from "../utils/rc600Parser";
+import {
+  loadPatch,
+  loadLibraryFromServer,
+  loadPatchFromServer,
+  subscribeToSlotChanges,
+  isSameDataFolder,
+} from "../utils/rc600Parser";
 
 interface RC600State {
   // Directory and file system
   directoryHandle: FileSystemDirectoryHandle | null;
   dataPath: string | null;
 
+  // Local library server (python3 rc600_server.py), only used when enabled
+  useServer: boolean;
+  unsubscribeServer: (() => void) | null;
+
   // Patches data
   patches: Map<number, Patch>;
   loadingPatches: boolean;
@@ -21,6 +31,7 @@ interface RC600State {
   // Actions
   setDirectoryHandle: (handle: FileSystemDirectoryHandle | null) => void;
   setDataPath: (path: string | null) => void;
+  setUseServer: (useServer: boolean) => void;
   loadPatches: () => Promise<void>;
   getPatch: (slot: number) => Patch | undefined;
   updatePatchName: (slot: number, name: string) => void;
@@ -35,6 +46,8 @@ export const useRC600Store = create<RC600State>((set, get) => ({
   // Initial state
   directoryHandle: null,
   dataPath: null,
+  useServer: false,
+  unsubscribeServer: null,
   patches: new Map<number, Patch>(),
   loadingPatches: false,
   selectedPatchSlot: null,
@@ -46,17 +59,49 @@ export const useRC600Store = create<RC600State>((set, get) => ({
 
   setDataPath: (path) => set({ dataPath: path }),
 
+  setUseServer: (useServer) => set({ useServer }),
+
   loadPatches: async () => {
-    const { directoryHandle } = get();
+    const { directoryHandle, dataPath, useServer, unsubscribeServer } = get();
     if (!directoryHandle) {
       console.warn("[RC600 Store] No directory handle available");
       return;
     }
+    if (unsubscribeServer) {
+      unsubscribeServer();
+      set({ unsubscribeServer: null });
+    }
 
     // //console.log ('[RC600 Store] Starting to load patches...');
     set({ loadingPatches: true });
 
     try {
+      // Use the pre-parsed library from the local server (one request) when
+      // enabled, and only if it serves the folder the user picked
+      const served = useServer ? await loadLibraryFromServer() : null;
+      if (served && !isSameDataFolder(served.path, dataPath)) {
+        console.warn(`[RC600 Store] Server reads ${served.path}, not ${dataPath}; reading the files instead`);
+      } else if (served) {
+        const unsubscribe = subscribeToSlotChanges(async (slot) => {
+          if (get().pendingChanges.has(slot)) {
+            return; // keep the user's unsaved edits
+          }
+          const patch = await loadPatchFromServer(slot);
+          const patches = new Map(get().patches);
+          if (patch) {
+            patches.set(slot, patch);
+          } else {
+            patches.delete(slot);
+          }
+          set({ patches });
+        });
+        set({ patches: served.patches, loadingPatches: false, unsubscribeServer: unsubscribe });
+        if (served.patches.size > 0) {
+          set({ selectedPatchSlot: Array.from(served.patches.keys())[0] });
+        }
+        return;
+      }
+
       const patches = new Map<number, Patch>();
 
       // Load patches for slots 0-99 (100 patches total)
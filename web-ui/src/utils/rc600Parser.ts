@@ -42,10 +42,12 @@ export async function getLatestBank(
     return null;
   }
 
-  // Return the bank with the highest count
-  const latest = counts.reduce((prev, current) =>
-    current.count > prev.count ? current : prev
-  );
+  // Return the bank with the newest count; counts are four hex digits and
+  // wrap from FFFF to 0000, so they are compared modulo 0x10000
+  const latest = counts.reduce((prev, current) => {
+    const ahead = (current.count - prev.count + 0x10000) % 0x10000;
+    return ahead > 0 && ahead < 0x8000 ? current : prev;
+  });
 
   //console.log (`[RC600 Parser] Latest bank for slot ${slot}: ${latest.bank} (count: ${latest.count})`);
   return latest;
@@ -109,3 +111,87 @@ export async function loadPatch(
     return null;
   }
 }
+
+/**
+ * Local Python library server (python3 rc600_server.py)
+ */
+export const RC600_SERVER_URL = "http://127.0.0.1:8600";
+
+/**
+ * A library served by the local server, with the DATA folder it reads
+ */
+export interface ServedLibrary {
+  path: string;
+  patches: Map<number, PatchType>;
+}
+
+/**
+ * Load the whole pre-parsed library from the local server in one request.
+ * Returns null if the server isn't running, so callers can fall back to
+ * reading the files directly.
+ */
+export async function loadLibraryFromServer(
+  baseUrl: string = RC600_SERVER_URL
+): Promise<ServedLibrary | null> {
+  try {
+    const response = await fetch(`${baseUrl}/api/library`);
+    if (!response.ok) {
+      return null;
+    }
+    const library: { path: string; patches: PatchType[]; errors: Record<string, string> } =
+      await response.json();
+
+    for (const [slot, error] of Object.entries(library.errors)) {
+      console.warn(`[RC600 Parser] Server could not load slot ${slot}: ${error}`);
+    }
+
+    return {
+      path: library.path,
+      patches: new Map(library.patches.map((patch) => [patch.slot, patch])),
+    };
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Whether a served DATA folder is the folder the user picked. The browser
+ * only knows the picked folder's name, so the last path components are compared.
+ */
+export function isSameDataFolder(servedPath: string, pickedName: string | null): boolean {
+  const servedName = servedPath.split(/[\\/]/).filter(Boolean).pop();
+  return pickedName !== null && servedName === pickedName;
+}
+
+/**
+ * Fetch a single patch from the local server
+ */
+export async function loadPatchFromServer(
+  slot: number,
+  baseUrl: string = RC600_SERVER_URL
+): Promise<PatchType | null> {
+  try {
+    const response = await fetch(`${baseUrl}/api/patches/${slot}`);
+    return response.ok ? await response.json() : null;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Subscribe to slot-change events pushed by the local server.
+ * Returns a function that closes the subscription.
+ */
+export function subscribeToSlotChanges(
+  onChange: (slot: number) => void,
+  baseUrl: string = RC600_SERVER_URL
+): () => void {
+  const socket = new WebSocket(`${baseUrl.replace(/^http/, "ws")}/ws`);
+  socket.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    if (message.type === "slot-changed") {
+      onChange(message.slot);
+    }
+  };
+  return () => socket.close();
+}